@@ -6,5 +6,10 @@ class AccountsConfig(AppConfig):
     name = 'accounts'
 
     def ready(self):
-        # Import signals to ensure they are connected when the app is ready.
-        import accounts.signals
+        from django.db.models.signals import post_save
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        from . import checks  # noqa: F401
+        from .tokens import remember_blacklisted
+
+        post_save.connect(remember_blacklisted, sender=BlacklistedToken, dispatch_uid='accounts.remember_blacklisted')
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core import checks
+
+from .hashers import unknown_profile
+
+
+@checks.register(checks.Tags.security)
+def check_password_hash_profile(app_configs, **kwargs):
+    """Catch a mistyped PASSWORD_HASH_PROFILE at deploy time rather than on every login."""
+    if getattr(settings, 'PASSWORD_HASH_ITERATIONS', None):
+        return []
+    error = unknown_profile(getattr(settings, 'PASSWORD_HASH_PROFILE', 'default'))
+    if error is None:
+        return []
+    return [checks.Error(error, hint='Or set PASSWORD_HASH_ITERATIONS explicitly.', id='accounts.E001')]
@@ -0,0 +1,97 @@
+"""
+Password hashing profiles and a bounded hashing pool.
+
+PBKDF2 is most of the cost of registering and logging in. The iteration
+count comes from a named profile (PASSWORD_HASH_PROFILE) so it can be
+tuned per deployment; hashes stored with another count are rehashed
+transparently on the user's next successful login. Measure the profiles
+on the target hardware with `python manage.py benchmark_auth`.
+
+Hashing runs on a process-wide thread pool of PASSWORD_HASH_WORKERS
+threads. hashlib releases the GIL while it works, so hashes run in
+parallel up to that bound and a registration burst queues for the pool
+instead of saturating every worker; async callers await the pool without
+blocking the event loop.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.exceptions import ImproperlyConfigured
+
+# PBKDF2-SHA256 iterations. Roughly 300 ms / 180 ms per hash on one
+# current x86 core.
+HASH_PROFILES = {
+    'default': 1_000_000,  # Django 5.2's default
+    'owasp': 600_000,      # OWASP Password Storage Cheat Sheet minimum
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def unknown_profile(profile):
+    """Error message for a PASSWORD_HASH_PROFILE that isn't in HASH_PROFILES, or None."""
+    if profile in HASH_PROFILES:
+        return None
+    return f"Unknown PASSWORD_HASH_PROFILE {profile!r}; valid profiles are {', '.join(HASH_PROFILES)}."
+
+
+def hash_iterations():
+    iterations = getattr(settings, 'PASSWORD_HASH_ITERATIONS', None)
+    if iterations:
+        return iterations
+    profile = getattr(settings, 'PASSWORD_HASH_PROFILE', 'default')
+    error = unknown_profile(profile)
+    if error:
+        raise ImproperlyConfigured(error)
+    return HASH_PROFILES[profile]
+
+
+class ProfiledPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 using the iterations of the configured profile.
+    Keeps the `pbkdf2_sha256` algorithm name, so existing hashes verify
+    as before and are upgraded (or downgraded) by `must_update`.
+    """
+
+    @property
+    def iterations(self):
+        return hash_iterations()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 2),
+                    thread_name_prefix='password-hash',
+                )
+    return _executor
+
+
+def make_password(password):
+    """`django.contrib.auth.hashers.make_password` on the hashing pool."""
+    return get_executor().submit(hashers.make_password, password).result()
+
+
+def make_passwords(passwords):
+    """Hash many passwords in parallel on the pool, keeping their order."""
+    return list(get_executor().map(hashers.make_password, passwords))
+
+
+def verify_password(password, encoded):
+    """Return `(is_correct, must_update)` like Django's verify_password, on the pool."""
+    return get_executor().submit(hashers.verify_password, password, encoded).result()
+
+
+async def amake_password(password):
+    return await asyncio.wrap_future(get_executor().submit(hashers.make_password, password))
+
+
+async def averify_password(password, encoded):
+    return await asyncio.wrap_future(get_executor().submit(hashers.verify_password, password, encoded))
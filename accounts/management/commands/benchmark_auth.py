@@ -0,0 +1,75 @@
+import time
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from accounts.hashers import HASH_PROFILES, make_passwords
+from accounts.views import LoginView, RegisterView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure password hashing cost and login/registration throughput per hashing profile (users are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10, help='Registrations and logins per profile')
+        parser.add_argument('--profiles', nargs='*', choices=sorted(HASH_PROFILES), help='Profiles to measure (default: all)')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        count = options['requests']
+        for profile in options['profiles'] or HASH_PROFILES:
+            with override_settings(PASSWORD_HASH_PROFILE=profile, PASSWORD_HASH_ITERATIONS=None):
+                hash_ms = self.best_of(3, lambda: make_password('benchmark-password')) * 1000
+                start = time.perf_counter()
+                make_passwords(['benchmark-password'] * count)
+                pool_rate = count / (time.perf_counter() - start)
+
+                try:
+                    with transaction.atomic():
+                        register_rate, login_rate = self.run(factory, count)
+                        raise Rollback
+                except Rollback:
+                    pass
+
+            self.stdout.write(
+                f"{profile:<8} {HASH_PROFILES[profile]:>9,} iterations  {hash_ms:7.1f} ms/hash  "
+                f"pool {pool_rate:6.1f} hashes/s  register {register_rate:6.1f} req/s  login {login_rate:6.1f} req/s"
+            )
+
+    def run(self, factory, count):
+        tag = uuid.uuid4().hex[:8]
+        register, login = RegisterView.as_view(), LoginView.as_view()
+        password = f'Bench-{tag}-pw'
+
+        start = time.perf_counter()
+        for n in range(count):
+            response = register(factory.post('/', {
+                'username': f'bench-{tag}-{n}', 'email': f'bench-{tag}-{n}@example.com',
+                'password': password, 'password2': password,
+            }, format='json'))
+            assert response.status_code == 201, response.data
+        register_rate = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for n in range(count):
+            response = login(factory.post('/', {'username': f'bench-{tag}-{n}', 'password': password}, format='json'))
+            assert response.status_code == 200, response.data
+        login_rate = count / (time.perf_counter() - start)
+        return register_rate, login_rate
+
+    @staticmethod
+    def best_of(repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,63 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.hashers import make_passwords
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import users from a CSV file with username,email[,first_name,last_name,password] columns. '
+        'Carts are created lazily on first use, so no rows are written besides the users.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the CSV file (first row is the header)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users per INSERT')
+
+    def handle(self, *args, **options):
+        try:
+            handle = open(options['csv_file'], newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(exc)
+
+        created = skipped = 0
+        with handle:
+            reader = csv.DictReader(handle)
+            missing = {'username', 'email'} - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(f"Missing column(s): {', '.join(sorted(missing))}")
+
+            batch, passwords = [], []
+            for row in reader:
+                batch.append(self.build_user(row))
+                passwords.append(row.get('password') or None)
+                if len(batch) >= options['batch_size']:
+                    inserted = self.insert(batch, passwords)
+                    created, skipped = created + inserted, skipped + len(batch) - inserted
+                    batch, passwords = [], []
+            if batch:
+                inserted = self.insert(batch, passwords)
+                created, skipped = created + inserted, skipped + len(batch) - inserted
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {created} users ({skipped} already existed).'))
+
+    @staticmethod
+    def build_user(row):
+        return CustomUser(
+            username=row['username'].strip(),
+            email=CustomUser.objects.normalize_email(row['email'].strip()),
+            first_name=(row.get('first_name') or '').strip(),
+            last_name=(row.get('last_name') or '').strip(),
+        )
+
+    @staticmethod
+    def insert(batch, passwords):
+        # Hashed in parallel on the hashing pool. Users without a password
+        # get an unusable one and must reset it before logging in.
+        for user, encoded in zip(batch, make_passwords(passwords)):
+            user.password = encoded
+        usernames = [user.username for user in batch]
+        existing = set(CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+        CustomUser.objects.bulk_create(batch, ignore_conflicts=True)
+        return CustomUser.objects.filter(username__in=usernames).count() - len(existing)
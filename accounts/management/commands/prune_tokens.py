@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tokens deleted per transaction')
+        parser.add_argument('--sleep', type=float, default=0.1, help='Seconds to pause between batches')
+        parser.add_argument('--grace-hours', type=int, default=0, help='Keep tokens that expired less than this long ago')
+
+    def handle(self, *args, **options):
+        cutoff = aware_utcnow() - timedelta(hours=options['grace_hours'])
+        expired = OutstandingToken.objects.filter(expires_at__lt=cutoff).order_by('pk')
+        pruned = 0
+        while True:
+            pks = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+            if not pks:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=pks).delete()
+                deleted, _ = OutstandingToken.objects.filter(pk__in=pks).delete()
+            pruned += deleted
+            if len(pks) < options['batch_size']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} expired tokens.'))
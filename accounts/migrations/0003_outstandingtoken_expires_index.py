@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    simplejwt's OutstandingToken has no index on expires_at, which
+    `prune_tokens` filters on. The table belongs to a third-party app, so
+    the index is created with plain SQL rather than a model Meta change.
+    """
+
+    dependencies = [
+        ('accounts', '0002_customuser_manager'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS outstandingtoken_expires_idx '
+            'ON token_blacklist_outstandingtoken (expires_at)',
+            'DROP INDEX IF EXISTS outstandingtoken_expires_idx',
+        ),
+    ]
@@ -1,5 +1,14 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from . import hashers
+
+class CustomUserManager(UserManager):
+    def _create_user_object(self, username, email, password, **extra_fields):
+        # Hash on the bounded pool (see accounts.hashers)
+        user = super()._create_user_object(username, email, None, **extra_fields)
+        if password is not None:
+            user.set_password(password)
+        return user
 
 # Create your models here.
 class CustomUser(AbstractUser):
@@ -9,5 +18,28 @@ class CustomUser(AbstractUser):
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
 
+    objects = CustomUserManager()
+
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+    def set_password(self, raw_password):
+        self.password = hashers.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Verify on the hashing pool; rehash if the stored hash uses an older profile."""
+        is_correct, must_update = hashers.verify_password(raw_password, self.password)
+        if is_correct and must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return is_correct
+
+    async def acheck_password(self, raw_password):
+        is_correct, must_update = await hashers.averify_password(raw_password, self.password)
+        if is_correct and must_update:
+            self.password = await hashers.amake_password(raw_password)
+            self._password = None
+            await self.asave(update_fields=['password'])
+        return is_correct
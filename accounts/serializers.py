@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
 from .models import CustomUser
+from .tokens import CachedBlacklistRefreshToken
 
 class UserRegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
@@ -30,4 +32,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'username', 'email', 'first_name', 'last_name',
             'phone_number', 'address', 'profile_picture', 'date_of_birth', 'is_staff'
-        )
\ No newline at end of file
+        )
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """Refresh serializer whose blacklist check can be cached, see accounts.tokens."""
+    token_class = CachedBlacklistRefreshToken
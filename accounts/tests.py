@@ -0,0 +1,104 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .checks import check_password_hash_profile
+from .hashers import ProfiledPBKDF2PasswordHasher, hash_iterations, make_passwords
+from .models import CustomUser
+from .tokens import CachedBlacklistRefreshToken
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=2000)
+class PasswordHashingTests(TestCase):
+    def test_registration_uses_the_profile(self):
+        response = APIClient().post('/api/v1/register/', {
+            'username': 'newbie', 'email': 'newbie@example.com',
+            'password': 'S3cure-pass!', 'password2': 'S3cure-pass!',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(CustomUser.objects.get().password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_login_rehashes_old_profiles(self):
+        old_hash = ProfiledPBKDF2PasswordHasher().encode('S3cure-pass!', 'saltsaltsalt', iterations=1000)
+        user = CustomUser.objects.create(username='oldie', email='oldie@example.com', password=old_hash)
+
+        client = APIClient()
+        self.assertEqual(client.post('/api/v1/token/', {'username': 'oldie', 'password': 'wrong'}).status_code, 401)
+        user.refresh_from_db()
+        self.assertEqual(user.password, old_hash)
+
+        self.assertEqual(client.post('/api/v1/token/', {'username': 'oldie', 'password': 'S3cure-pass!'}).status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(user.check_password('S3cure-pass!'))
+
+    def test_pool_hashes_in_order(self):
+        encoded = make_passwords(['a', 'b', None])
+        self.assertTrue(ProfiledPBKDF2PasswordHasher().verify('b', encoded[1]))
+        self.assertFalse(encoded[2].startswith('pbkdf2'))
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=None, PASSWORD_HASH_PROFILE='fast')
+    def test_unknown_profile_is_reported(self):
+        errors = check_password_hash_profile(None)
+        self.assertEqual([error.id for error in errors], ['accounts.E001'])
+        self.assertIn('default, owasp', errors[0].msg)
+        with self.assertRaisesMessage(ImproperlyConfigured, "Unknown PASSWORD_HASH_PROFILE 'fast'"):
+            hash_iterations()
+
+
+class RefreshTokenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('tess', 'tess@example.com')
+
+    def setUp(self):
+        caches['local'].clear()
+
+    def refresh(self, token):
+        return APIClient().post('/api/v1/token/refresh/', {'refresh': str(token)})
+
+    def blacklist_queries(self, token):
+        with CaptureQueriesContext(connection) as queries:
+            status = self.refresh(token).status_code
+        return status, sum('token_blacklist' in query['sql'] for query in queries)
+
+    def test_blacklist_check_hits_the_database_without_a_cache(self):
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        self.assertEqual(self.blacklist_queries(token), (200, 1))
+        token.blacklist()
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    @override_settings(JWT_BLACKLIST_CACHE='local')
+    def test_blacklist_check_is_cached(self):
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        self.assertEqual(self.blacklist_queries(token), (200, 1))
+        self.assertEqual(self.blacklist_queries(token), (200, 0))
+
+        token.blacklist()
+        self.assertEqual(self.blacklist_queries(token), (401, 0))
+
+    @override_settings(JWT_BLACKLIST_CACHE='local')
+    def test_blacklisting_elsewhere_overrides_a_cached_clean_result(self):
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+        self.assertEqual(self.blacklist_queries(token), (401, 0))
+
+    def test_prune_tokens(self):
+        live = CachedBlacklistRefreshToken.for_user(self.user)
+        for _ in range(3):
+            CachedBlacklistRefreshToken.for_user(self.user).blacklist()
+        OutstandingToken.objects.exclude(jti=live['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+
+        call_command('prune_tokens', batch_size=2, sleep=0, stdout=StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -0,0 +1,63 @@
+"""
+Refresh tokens whose blacklist check can be fronted by a shared cache.
+
+simplejwt checks `BlacklistedToken` (joined to the ever-growing
+`OutstandingToken` table) on every refresh. That lookup goes through the
+unique jti index and `prune_tokens` keeps the tables small, so without a
+shared cache (JWT_BLACKLIST_CACHE is None) it is done directly.
+
+With one, the answer for a jti is cached: a blacklisted token stays
+blacklisted until it expires, and a clean result is trusted for
+JWT_BLACKLIST_CACHE_TIMEOUT seconds, about one refresh cycle, so the next
+refresh is usually a hit. Every new `BlacklistedToken` row, including ones
+added in the admin, overwrites the cached answer straight away.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+
+def blacklist_cache_key(jti):
+    return f'jwt-blacklisted:{jti}'
+
+
+def blacklist_cache():
+    if settings.JWT_BLACKLIST_CACHE is None:
+        return None
+    return caches[settings.JWT_BLACKLIST_CACHE]
+
+
+def seconds_left(expires_at):
+    return max(int((expires_at - aware_utcnow()).total_seconds()), 1)
+
+
+def remember_blacklisted(sender, instance, created, **kwargs):
+    """post_save receiver for BlacklistedToken, connected in AccountsConfig.ready()."""
+    cache = blacklist_cache()
+    if created and cache is not None:
+        token = instance.token
+        cache.set(blacklist_cache_key(token.jti), True, seconds_left(token.expires_at))
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        cache = blacklist_cache()
+        blacklisted = None if cache is None else cache.get(blacklist_cache_key(jti))
+        if blacklisted is None:
+            blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            if cache is not None:
+                cache.set(blacklist_cache_key(jti), blacklisted, self.cache_timeout(blacklisted))
+        if blacklisted:
+            raise TokenError(_("Token is blacklisted"))
+
+    def cache_timeout(self, blacklisted):
+        remaining = seconds_left(datetime_from_epoch(self.payload['exp']))
+        if blacklisted:
+            return remaining
+        return min(remaining, settings.JWT_BLACKLIST_CACHE_TIMEOUT)
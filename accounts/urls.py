@@ -1,15 +1,12 @@
 from django.urls import path
-from .views import RegisterView, UserProfileView
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from .views import LoginView, RegisterView, UserProfileView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='auth_register'),
     path('user/', UserProfileView.as_view(), name='user_profile'),
     
     # JWT Login and Refresh endpoints
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/', LoginView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
\ No newline at end of file
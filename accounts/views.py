@@ -1,7 +1,10 @@
 from django.shortcuts import render
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
+from orders.guest_cart import GuestCart, merge_into
 from .models import CustomUser
 from .serializers import UserRegisterSerializer, UserProfileSerializer
 
@@ -22,7 +25,7 @@ class RegisterView(generics.CreateAPIView):
         # Generate JWT tokens for the new user
         refresh = RefreshToken.for_user(user)
         
-        return Response({
+        response = Response({
             'user': {
                 'id': user.id,
                 'username': user.username,
@@ -34,6 +37,30 @@ class RegisterView(generics.CreateAPIView):
             'access': str(refresh.access_token),
             'message': 'User registered successfully'
         }, status=status.HTTP_201_CREATED)
+        return adopt_guest_cart(request, user, response)
+
+class LoginView(TokenObtainPairView):
+    """
+    TokenObtainPairView that also moves the caller's guest cart into their account.
+    """
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        response = Response(serializer.validated_data, status=status.HTTP_200_OK)
+        return adopt_guest_cart(request, serializer.user, response)
+
+def adopt_guest_cart(request, user, response):
+    """Merge the request's guest cart into `user`'s cart and drop the cookie."""
+    guest_cart = GuestCart.from_request(request)
+    if guest_cart:
+        merge_into(user, guest_cart)
+        guest_cart.clear()
+        guest_cart.save(response)
+    return response
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
     queryset = CustomUser.objects.all()
@@ -0,0 +1,10 @@
+from django.contrib.auth import get_user_model
+
+from core.backfill import backfill
+from .rollups import rebuild_customer_stats
+
+
+@backfill(get_user_model().objects.all())
+def customer_stats(batch):
+    """Recompute CustomerStats for every user from their orders."""
+    rebuild_customer_stats(list(batch.values_list('pk', flat=True)))
@@ -0,0 +1,35 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import rebuild_customer_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recompute CustomerStats from the hot and archived orders in chunked batches of users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users per batch')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        total = 0
+
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            total += rebuild_customer_stats(user_ids)
+            last_id = user_ids[-1]
+            self.stdout.write(f"Rebuilt stats up to user {last_id} ({total} customers with orders)")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {total} customers.'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('order_count', models.IntegerField(default=0)),
+                ('lifetime_spend', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('average_order_value', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('last_order_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Customer stats',
+                'ordering': ['-lifetime_spend'],
+                'indexes': [models.Index(fields=['-lifetime_spend'], name='customerstats_spend_idx'), models.Index(fields=['-order_count'], name='customerstats_orders_idx'), models.Index(fields=['-average_order_value'], name='customerstats_aov_idx'), models.Index(fields=['-last_order_at'], name='customerstats_last_order_idx')],
+            },
+        ),
+    ]
@@ -70,4 +70,26 @@ class UserActivity(models.Model):
         ordering = ['-timestamp']
 
     def __str__(self):
-        return f"{self.activity_type} - {self.timestamp}"
\ No newline at end of file
+        return f"{self.activity_type} - {self.timestamp}"
+
+class CustomerStats(models.Model):
+    """Lifetime order metrics per customer, maintained by analytics.rollups"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    order_count = models.IntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    average_order_value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    last_order_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Customer stats"
+        ordering = ['-lifetime_spend']
+        indexes = [
+            models.Index(fields=['-lifetime_spend'], name='customerstats_spend_idx'),
+            models.Index(fields=['-order_count'], name='customerstats_orders_idx'),
+            models.Index(fields=['-average_order_value'], name='customerstats_aov_idx'),
+            models.Index(fields=['-last_order_at'], name='customerstats_last_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stats for {self.user}: {self.order_count} orders, ${self.lifetime_spend}"
@@ -0,0 +1,155 @@
+"""
+Incremental maintenance of CustomerStats.
+
+Checkout and order status changes report per-user deltas here instead of
+recomputing lifetime metrics over the Order table. Cancelled orders don't
+count towards a customer's stats.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Max, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import CustomerStats
+
+CANCELLED = 'cancelled'
+CENTS = Decimal('0.01')
+
+
+def adjust_customer_stats(deltas, last_order_at=None):
+    """
+    Apply `{user_id: (order_count_delta, spend_delta)}` to CustomerStats.
+
+    Counters are moved with one F() UPDATE for all users; the average order
+    value is then recomputed in Decimal for just those rows.
+    `last_order_at`, if given, is stored for every user in `deltas` unless
+    theirs is already later.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if user_id is not None and any(delta)}
+    if not deltas:
+        return
+
+    CustomerStats.objects.bulk_create(
+        [CustomerStats(user_id=user_id) for user_id in deltas], ignore_conflicts=True
+    )
+
+    updates = {
+        'order_count': F('order_count') + Case(
+            *[When(user_id=user_id, then=Value(count)) for user_id, (count, _) in deltas.items()],
+            default=Value(0), output_field=IntegerField(),
+        ),
+        'lifetime_spend': F('lifetime_spend') + Case(
+            *[When(user_id=user_id, then=Value(spend)) for user_id, (_, spend) in deltas.items()],
+            default=Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    }
+    if last_order_at is not None:
+        # Coalesce: Greatest() is NULL on SQLite if any argument is
+        updates['last_order_at'] = Greatest(Coalesce(F('last_order_at'), Value(last_order_at)), Value(last_order_at))
+    CustomerStats.objects.filter(user_id__in=deltas).update(**updates)
+
+    stats = list(CustomerStats.objects.filter(user_id__in=deltas).only('order_count', 'lifetime_spend'))
+    for row in stats:
+        row.average_order_value = average_order_value(row.lifetime_spend, row.order_count)
+    CustomerStats.objects.bulk_update(stats, ['average_order_value'])
+
+
+def average_order_value(spend, count):
+    if count <= 0:
+        return Decimal('0.00')
+    return (Decimal(spend) / count).quantize(CENTS)
+
+
+def refresh_last_order_at(user_ids):
+    """
+    Recompute last_order_at from the hot and archived orders after orders
+    drop out (e.g. cancellation).
+    """
+    from orders.models import ArchivedOrder, Order
+
+    latest = {}
+    for model in (Order, ArchivedOrder):
+        rows = model.objects.filter(user_id__in=user_ids).exclude(status=CANCELLED) \
+            .values('user_id').annotate(latest=Max('created_at')).values_list('user_id', 'latest')
+        for user_id, created_at in rows:
+            latest[user_id] = max(created_at, latest.get(user_id, created_at))
+    stats = list(CustomerStats.objects.filter(user_id__in=user_ids).only('last_order_at'))
+    for row in stats:
+        row.last_order_at = latest.get(row.user_id)
+    CustomerStats.objects.bulk_update(stats, ['last_order_at'])
+
+
+def record_order_placed(order):
+    """Count a newly created order towards its customer's stats."""
+    if order.status == CANCELLED:
+        return
+    adjust_customer_stats({order.user_id: (1, order.total_amount)}, last_order_at=order.created_at)
+
+
+def record_status_changes(changes):
+    """
+    Account for a batch of status changes, given as
+    `(user_id, total_amount, old_status, new_status)` tuples.
+    Only moves into or out of 'cancelled' affect the stats.
+    """
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    affected_users = set()
+    for user_id, total_amount, old_status, new_status in changes:
+        if user_id is None or (old_status == CANCELLED) == (new_status == CANCELLED):
+            continue
+        sign = -1 if new_status == CANCELLED else 1
+        deltas[user_id][0] += sign
+        deltas[user_id][1] += sign * total_amount
+        affected_users.add(user_id)
+
+    adjust_customer_stats({user_id: tuple(delta) for user_id, delta in deltas.items()})
+    if affected_users:
+        refresh_last_order_at(affected_users)
+
+
+def rebuild_customer_stats(user_ids):
+    """
+    Recompute CustomerStats from scratch for `user_ids`, from the hot and
+    archived orders. Returns the number of customers with orders.
+    """
+    from orders.models import ArchivedOrder, Order
+
+    totals = {}
+    for model in (Order, ArchivedOrder):
+        rows = (
+            model.objects.filter(user_id__in=user_ids)
+            .exclude(status=CANCELLED)
+            .values('user_id')
+            .annotate(order_count=Count('id'), lifetime_spend=Sum('total_amount'), last_order_at=Max('created_at'))
+            .values_list('user_id', 'order_count', 'lifetime_spend', 'last_order_at')
+        )
+        for user_id, count, spend, last_order_at in rows:
+            if user_id in totals:
+                previous = totals[user_id]
+                count, spend = count + previous[0], spend + previous[1]
+                last_order_at = max(last_order_at, previous[2])
+            totals[user_id] = (count, spend, last_order_at)
+    stats = [
+        CustomerStats(
+            user_id=user_id,
+            order_count=count,
+            lifetime_spend=spend,
+            average_order_value=average_order_value(spend, count),
+            last_order_at=last_order_at,
+        )
+        for user_id, (count, spend, last_order_at) in totals.items()
+    ]
+
+    with transaction.atomic():
+        CustomerStats.objects.filter(user_id__in=user_ids).exclude(
+            user_id__in=[row.user_id for row in stats]
+        ).delete()
+        CustomerStats.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['order_count', 'lifetime_spend', 'average_order_value', 'last_order_at', 'updated_at'],
+        )
+    return len(stats)
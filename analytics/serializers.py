@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import DashboardSummary, SalesMetric, ProductAnalytics, UserActivity
+from .models import DashboardSummary, SalesMetric, ProductAnalytics, UserActivity, CustomerStats
 
 class DashboardSummarySerializer(serializers.ModelSerializer):
     class Meta:
@@ -30,4 +30,14 @@ class RecentOrderSerializer(serializers.Serializer):
     customer_name = serializers.CharField()
     total = serializers.DecimalField(max_digits=10, decimal_places=2)
     status = serializers.CharField()
-    created_at = serializers.DateTimeField()
\ No newline at end of file
+    created_at = serializers.DateTimeField()
+
+class CustomerStatsSerializer(serializers.ModelSerializer):
+    user_id = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+    email = serializers.EmailField(source='user.email', read_only=True)
+
+    class Meta:
+        model = CustomerStats
+        fields = ['user_id', 'username', 'email', 'order_count', 'lifetime_spend',
+                  'average_order_value', 'last_order_at']
@@ -1,3 +1,118 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.jobs import run_pending
+from orders.models import Order
+from products.models import Category, Product
+from . import rollups
+from .models import CustomerStats
+from .views import day_range, orders_on
+
+User = get_user_model()
+
+
+class CustomerStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('ann', 'ann@example.com', 'pass')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        category = Category.objects.create(name='Creatine', slug='creatine')
+        cls.product = Product.objects.create(
+            category=category, name='Creatine', slug='creatine', description='x',
+            image='products/bcaa1.jpg', price=Decimal('10.00'), sku='FS-C', stock_quantity=100,
+        )
+
+    def place_order(self, quantity, drain=True):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        response = client.post('/api/v1/orders/', {
+            'shipping_address': 'a', 'billing_address': 'b', 'total_amount': '0.00',
+            'items': [{'product_id': self.product.pk, 'quantity': quantity}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        if drain:
+            run_pending()
+        return response.json()
+
+    def cancel(self, order):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        client.patch(f"/api/v1/orders/{order['id']}/", {'status': 'cancelled'}, format='json')
+
+    def test_checkout_and_cancellation_maintain_stats(self):
+        self.place_order(1)
+        second = self.place_order(2)
+
+        stats = CustomerStats.objects.get(user=self.customer)
+        self.assertEqual((stats.order_count, stats.lifetime_spend, stats.average_order_value),
+                         (2, Decimal('30.00'), Decimal('15.00')))
+
+        self.cancel(second)
+
+        stats.refresh_from_db()
+        self.assertEqual((stats.order_count, stats.lifetime_spend, stats.average_order_value),
+                         (1, Decimal('10.00'), Decimal('10.00')))
+        first = Order.objects.exclude(pk=second['id']).get()
+        self.assertEqual(stats.last_order_at, first.created_at)
+
+    def test_cancellation_before_the_queue_drains(self):
+        self.cancel(self.place_order(2, drain=False))
+        run_pending()
+
+        stats = CustomerStats.objects.get(user=self.customer)
+        self.assertEqual((stats.order_count, stats.lifetime_spend, stats.last_order_at), (0, Decimal('0.00'), None))
+
+    def test_last_order_at_never_moves_back(self):
+        self.place_order(1)
+        latest = CustomerStats.objects.get(user=self.customer).last_order_at
+        rollups.adjust_customer_stats({self.customer.pk: (1, Decimal('5.00'))}, last_order_at=latest - timedelta(days=1))
+        self.assertEqual(CustomerStats.objects.get(user=self.customer).last_order_at, latest)
+
+    def test_rebuild_matches_incremental_stats(self):
+        self.place_order(1)
+        self.place_order(3)
+        incremental = CustomerStats.objects.values().get(user=self.customer)
+        CustomerStats.objects.all().delete()
+
+        call_command('rebuild_customer_stats', batch_size=1, stdout=StringIO())
+
+        rebuilt = CustomerStats.objects.values().get(user=self.customer)
+        incremental.pop('updated_at'), rebuilt.pop('updated_at')
+        self.assertEqual(rebuilt, incremental)
+
+    def test_staff_endpoint_sorts_and_filters(self):
+        self.place_order(1)
+        client = APIClient()
+        client.force_authenticate(self.staff)
+
+        response = client.get('/api/v1/dashboard/customers/', {'ordering': '-order_count', 'min_spend': '5'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['username'] for row in response.json()['results']], ['ann'])
+        response = client.get('/api/v1/dashboard/customers/', {'min_spend': '50'})
+        self.assertEqual(response.json()['count'], 0)
+
+
+class DayRangeTests(TestCase):
+    def test_orders_on_is_an_indexed_range(self):
+        user = User.objects.create_user('dee', 'dee@example.com', 'pass')
+        order = Order.objects.create(user=user, total_amount=Decimal('1.00'), shipping_address='a', billing_address='b')
+        today = timezone.localdate(order.created_at)
+        start, end = day_range(today)
+        Order.objects.filter(pk=order.pk).update(created_at=start)
+
+        self.assertEqual(list(orders_on(today)), [order])
+        self.assertEqual(list(orders_on(today - timedelta(days=1))), [])
+        self.assertEqual(list(Order.objects.filter(created_at__date=today)), [order])
 
-# Create your tests here.
+        # `created_at__date` wraps the column in a function, so only the range can use the index
+        if connection.vendor == 'sqlite':
+            self.assertIn('USING INDEX', orders_on(today).explain())
+            self.assertNotIn('USING INDEX', Order.objects.filter(created_at__date=today).explain())
@@ -1,17 +1,52 @@
 from rest_framework import generics, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from django_filters import rest_framework as filters
 from django.utils import timezone
 from django.db.models import Sum, Count, Avg
-from datetime import timedelta
-from .models import DashboardSummary, SalesMetric, ProductAnalytics
-from .serializers import DashboardSummarySerializer, SalesMetricSerializer, RecentOrderSerializer
+from datetime import datetime, time, timedelta
+from core.throttling import capped_int, throttle_cost
+from .models import DashboardSummary, SalesMetric, ProductAnalytics, CustomerStats
+from .serializers import DashboardSummarySerializer, SalesMetricSerializer, RecentOrderSerializer, CustomerStatsSerializer
 from orders.models import Order  # Assuming you have an Order model
 
+def day_range(date):
+    """
+    Half-open [start, end) datetimes of `date` in the current timezone.
+    Filtering on `created_at__gte/__lt` can use the created_at indexes,
+    unlike `created_at__date`, which wraps the column in a function.
+    """
+    start = timezone.make_aware(datetime.combine(date, time.min))
+    end = timezone.make_aware(datetime.combine(date + timedelta(days=1), time.min))
+    return start, end
+
+def orders_on(date):
+    start, end = day_range(date)
+    return Order.objects.filter(created_at__gte=start, created_at__lt=end)
+
+def sales_metric(date):
+    """The stored SalesMetric for `date`, computed from that day's orders on first use."""
+    try:
+        return SalesMetric.objects.get(date=date)
+    except SalesMetric.DoesNotExist:
+        daily_orders = orders_on(date)
+        daily_sales = daily_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+        daily_customers = daily_orders.values('user').distinct().count()
+        # get_or_create: a concurrent request (or warm_caches) may store it first
+        metric, _ = SalesMetric.objects.get_or_create(date=date, defaults={
+            'daily_sales': daily_sales,
+            'daily_orders': daily_orders.count(),
+            'daily_customers': daily_customers,
+        })
+        return metric
+
 class DashboardSummaryView(generics.RetrieveAPIView):
     """Get current dashboard summary"""
     permission_classes = [permissions.IsAdminUser]
     serializer_class = DashboardSummarySerializer
+    throttle_cost = 5  # recomputes the day's aggregates
     
     def get_object(self):
         today = timezone.now().date()
@@ -37,7 +72,7 @@ class DashboardSummaryView(generics.RetrieveAPIView):
         from accounts.models import CustomUser
         
         # Get orders for today - using correct field names
-        today_orders = Order.objects.filter(created_at__date=date)
+        today_orders = orders_on(date)
         
         # Calculate metrics using correct field names
         total_sales = today_orders.aggregate(
@@ -46,8 +81,9 @@ class DashboardSummaryView(generics.RetrieveAPIView):
         
         new_orders = today_orders.count()
         
+        start, end = day_range(date)
         new_customers = CustomUser.objects.filter(
-            date_joined__date=date
+            date_joined__gte=start, date_joined__lt=end
         ).count()
         
         avg_order_value = today_orders.aggregate(
@@ -62,11 +98,23 @@ class DashboardSummaryView(generics.RetrieveAPIView):
             'average_order_value': avg_order_value
         }
 
+MAX_CHART_DAYS = 90
+MAX_RECENT_ORDERS = 100
+
+def sales_chart_cost(request):
+    """A week of missing metrics costs about one request's worth of queries."""
+    try:
+        days = int(request.query_params.get('days', 7))
+    except ValueError:
+        return 1
+    return max(1, min(days, MAX_CHART_DAYS) // 7)
+
+@throttle_cost(sales_chart_cost)
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
 def sales_chart_data(request):
     """Get sales data for charts"""
-    days = int(request.GET.get('days', 7))
+    days = capped_int(request, 'days', 7, 1, MAX_CHART_DAYS)
     end_date = timezone.now().date()
     start_date = end_date - timedelta(days=days-1)
     
@@ -74,23 +122,7 @@ def sales_chart_data(request):
     sales_data = []
     for i in range(days):
         date = start_date + timedelta(days=i)
-        
-        # Try to get existing metric or calculate fresh
-        try:
-            metric = SalesMetric.objects.get(date=date)
-        except SalesMetric.DoesNotExist:
-            # Calculate for this date using correct field names
-            daily_orders = Order.objects.filter(created_at__date=date)
-            daily_sales = daily_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0  # Fixed field name
-            daily_customers = daily_orders.values('user').distinct().count()  # Changed from 'customer' to 'user'
-            
-            metric = SalesMetric.objects.create(
-                date=date,
-                daily_sales=daily_sales,
-                daily_orders=daily_orders.count(),
-                daily_customers=daily_customers
-            )
-        
+        metric = sales_metric(date)
         sales_data.append({
             'date': date.strftime('%Y-%m-%d'),
             'sales': float(metric.daily_sales)
@@ -102,7 +134,7 @@ def sales_chart_data(request):
 @permission_classes([permissions.IsAdminUser])
 def recent_orders(request):
     """Get recent orders for dashboard"""
-    limit = int(request.GET.get('limit', 10))
+    limit = capped_int(request, 'limit', 10, 1, MAX_RECENT_ORDERS)
     
     orders = Order.objects.select_related('user').order_by('-created_at')[:limit]
     
@@ -119,4 +151,39 @@ def recent_orders(request):
             'created_at': order.created_at.isoformat()
         })
     
-    return Response(orders_data)
\ No newline at end of file
+    return Response(orders_data)
+
+
+class CustomerStatsFilter(filters.FilterSet):
+    min_orders = filters.NumberFilter(field_name='order_count', lookup_expr='gte')
+    max_orders = filters.NumberFilter(field_name='order_count', lookup_expr='lte')
+    min_spend = filters.NumberFilter(field_name='lifetime_spend', lookup_expr='gte')
+    max_spend = filters.NumberFilter(field_name='lifetime_spend', lookup_expr='lte')
+    min_aov = filters.NumberFilter(field_name='average_order_value', lookup_expr='gte')
+    max_aov = filters.NumberFilter(field_name='average_order_value', lookup_expr='lte')
+    last_order_after = filters.IsoDateTimeFilter(field_name='last_order_at', lookup_expr='gte')
+    last_order_before = filters.IsoDateTimeFilter(field_name='last_order_at', lookup_expr='lt')
+
+    class Meta:
+        model = CustomerStats
+        fields = []
+
+
+class CustomerStatsPagination(LimitOffsetPagination):
+    default_limit = 50
+    max_limit = 500
+
+
+class CustomerStatsListView(generics.ListAPIView):
+    """
+    Per-customer lifetime metrics, read from the materialized CustomerStats table.
+    Every sortable column has its own index.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = CustomerStatsSerializer
+    queryset = CustomerStats.objects.select_related('user')
+    pagination_class = CustomerStatsPagination
+    filter_backends = [filters.DjangoFilterBackend, OrderingFilter]
+    filterset_class = CustomerStatsFilter
+    ordering_fields = ['order_count', 'lifetime_spend', 'average_order_value', 'last_order_at']
+    ordering = ['-lifetime_spend']
\ No newline at end of file
@@ -9,4 +9,11 @@ pip install -r requirements.txt
 python manage.py collectstatic --no-input
 
 # 3. Apply database migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+python manage.py createcachetable
+
+# Backfills resume where the last run stopped and are no-ops once done
+python manage.py run_backfill orders.order_item_snapshots
+
+# 4. Prime the shared cache and dashboard metrics (failures don't fail the build)
+python manage.py warm_caches || true
@@ -1,3 +1,18 @@
 from django.contrib import admin
+from django.utils import timezone
+from .models import Job
 
 # Register your models here.
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('name', 'args', 'kwargs', 'attempts', 'locked_at', 'last_error', 'created_at')
+    actions = ['retry_jobs']
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.QUEUED, attempts=0, run_at=timezone.now(), locked_at=None
+        )
+        self.message_user(request, f'{updated} job(s) queued for retry.')
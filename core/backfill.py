@@ -0,0 +1,100 @@
+"""
+Chunked, resumable backfills.
+
+Filling a new column or rollup for every existing row in one migration
+UPDATE locks the table for as long as it runs. Register the work as a
+backfill instead, in the app's `backfills.py`, and run it with
+`manage.py run_backfill <name>` after the schema migration is deployed:
+
+    @backfill(OrderItem.objects.filter(product_name=''))
+    def order_item_snapshots(batch):
+        batch.update(...)
+
+The queryset is walked in primary key order (keyset pagination, so every
+batch is an index range scan however far along the job is) and the
+function gets each batch as a queryset of at most `batch_size` rows. Every
+batch runs in its own transaction together with the BackfillCheckpoint
+update, so an interrupted run resumes after the last committed batch.
+Backfills must be idempotent: a row may be seen again after `--restart`.
+"""
+import time
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import BackfillCheckpoint
+
+_registry = {}
+_discovered = False
+
+
+class Backfill:
+    def __init__(self, func, queryset, batch_size):
+        self.func = func
+        self.name = f"{func.__module__.removesuffix('.backfills')}.{func.__name__}"
+        self.queryset = queryset
+        self.batch_size = batch_size
+        self.__doc__ = func.__doc__
+
+    def checkpoint(self):
+        return BackfillCheckpoint.objects.filter(name=self.name).first() or BackfillCheckpoint(name=self.name)
+
+    def reset(self):
+        BackfillCheckpoint.objects.filter(name=self.name).delete()
+
+    def remaining(self, checkpoint):
+        return self.queryset.filter(pk__gt=checkpoint.last_pk).count()
+
+    def run(self, batch_size=None, sleep=0, max_batches=None, progress=None):
+        """
+        Process batches from the last checkpoint until the queryset is
+        exhausted (or `max_batches` have run). `progress(checkpoint)` is
+        called after each committed batch. Returns the checkpoint.
+        """
+        batch_size = batch_size or self.batch_size
+        checkpoint, _ = BackfillCheckpoint.objects.get_or_create(name=self.name)
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            with transaction.atomic():
+                checkpoint = BackfillCheckpoint.objects.select_for_update().get(pk=checkpoint.pk)
+                pks = list(
+                    self.queryset.filter(pk__gt=checkpoint.last_pk).order_by('pk')
+                    .values_list('pk', flat=True)[:batch_size]
+                )
+                if not pks:
+                    checkpoint.finished_at = checkpoint.finished_at or timezone.now()
+                    checkpoint.save(update_fields=['finished_at', 'updated_at'])
+                    break
+                self.func(self.queryset.model._default_manager.filter(pk__in=pks))
+                checkpoint.last_pk = pks[-1]
+                checkpoint.rows_done += len(pks)
+                checkpoint.finished_at = None
+                checkpoint.save(update_fields=['last_pk', 'rows_done', 'finished_at', 'updated_at'])
+            batches += 1
+            if progress is not None:
+                progress(checkpoint)
+            if sleep:
+                time.sleep(sleep)
+        return checkpoint
+
+
+def backfill(queryset, *, batch_size=1000):
+    """Register a function as a backfill over `queryset`, named `<app>.<function>`."""
+    def decorator(func):
+        registered = Backfill(func, queryset, batch_size)
+        _registry[registered.name] = registered
+        return registered
+    return decorator
+
+
+def get_backfills():
+    global _discovered
+    if not _discovered:
+        autodiscover_modules('backfills')
+        _discovered = True
+    return dict(sorted(_registry.items()))
+
+
+def get_backfill(name):
+    return get_backfills().get(name)
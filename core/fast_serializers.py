@@ -0,0 +1,195 @@
+import decimal
+import threading
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.db import models
+from rest_framework import fields, relations, serializers
+from rest_framework.settings import api_settings
+
+# Step kinds
+VALUE = 0
+FILE = 1
+NESTED = 2
+MANY = 3
+
+
+class ValuesPlan:
+    """
+    Precompiled read path for a DRF serializer.
+
+    The serializer's readable fields are introspected once and turned into a
+    flat list of `.values_list()` lookups plus a converter per field. Rows are
+    then turned straight into dicts, skipping `get_attribute`, model instance
+    construction and the per-field `to_representation` dispatch. Nested
+    serializers are flattened into the same row; `many=True` nested
+    serializers are fetched with one extra query per level.
+
+    The output is identical to `serializer_class(queryset, many=True).data`.
+    Serializers using SerializerMethodField, `source='*'` or hyperlinked
+    fields can't be compiled and raise ImproperlyConfigured.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._compiled = False
+        self._lock = threading.Lock()
+
+    def _compile(self):
+        # Plans are module-level objects shared by all threads. The first
+        # caller builds into locals under the lock and publishes the finished
+        # plan; `_compiled` is set last, so readers never see a partial one.
+        with self._lock:
+            if self._compiled:
+                return
+            serializer = self.serializer_class()
+            lookups = []
+            steps = self._compile_fields(serializer, serializer.Meta.model, '', lookups)
+            self.model, self.lookups, self.steps = serializer.Meta.model, lookups, steps
+            self._compiled = True
+
+    @staticmethod
+    def _column(lookups, lookup):
+        try:
+            return lookups.index(lookup)
+        except ValueError:
+            lookups.append(lookup)
+            return len(lookups) - 1
+
+    def _compile_fields(self, serializer, model, prefix, lookups):
+        steps = []
+        for field in serializer._readable_fields:
+            source = field.source
+            if source == '*':
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{field.field_name}: source='*' can't be read from values()."
+                )
+            lookup = prefix + source.replace('.', '__')
+
+            if isinstance(field, serializers.ListSerializer):
+                child = self._compile_many(field, model, source)
+                steps.append((field.field_name, self._column(lookups, prefix + 'pk'), child, MANY))
+            elif isinstance(field, serializers.BaseSerializer):
+                nested_model = field.Meta.model
+                nested = self._compile_fields(field, nested_model, lookup + '__', lookups)
+                steps.append((field.field_name, self._column(lookups, lookup + '__pk'), nested, NESTED))
+            elif isinstance(field, fields.FileField):
+                if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+                    steps.append((field.field_name, self._column(lookups, lookup), str, VALUE))
+                else:
+                    steps.append((field.field_name, self._column(lookups, lookup), self._storage_for(model, source), FILE))
+            else:
+                steps.append((field.field_name, self._column(lookups, lookup), self._converter(field), VALUE))
+        return steps
+
+    def _compile_many(self, field, model, source):
+        try:
+            relation = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            relation = None
+        if not isinstance(relation, models.ManyToOneRel):
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}.{field.field_name}: only reverse foreign keys are supported."
+            )
+        # Private to this plan until it is published, so finishing it here is safe
+        child = ValuesPlan(type(field.child))
+        child._compile()
+        child.parent_index = self._column(child.lookups, relation.field.name)
+        return child
+
+    @staticmethod
+    def _storage_for(model, source):
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return default_storage
+        return getattr(model_field, 'storage', default_storage)
+
+    def _converter(self, field):
+        if isinstance(field, (serializers.SerializerMethodField, relations.HyperlinkedRelatedField,
+                              relations.ManyRelatedField)):
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}.{field.field_name}: {type(field).__name__} can't be precompiled."
+            )
+        if isinstance(field, (fields.ReadOnlyField, relations.PrimaryKeyRelatedField, fields.BooleanField)):
+            if getattr(field, 'pk_field', None) is not None:
+                return field.pk_field.to_representation
+            return None
+        if isinstance(field, fields.ChoiceField):
+            return field.to_representation
+        if isinstance(field, fields.CharField):
+            return str
+        if isinstance(field, fields.IntegerField):
+            return int
+        if isinstance(field, fields.DecimalField):
+            return self._decimal_converter(field)
+        # DateTimeField, DateField, UUIDField, JSONField, ...: the bound
+        # field method is cheap and keeps formatting rules in one place.
+        return field.to_representation
+
+    @staticmethod
+    def _decimal_converter(field):
+        coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+            return field.to_representation
+        quantize = field.quantize
+
+        def convert(value):
+            if not isinstance(value, decimal.Decimal):
+                value = decimal.Decimal(str(value).strip())
+            return f'{quantize(value):f}'
+        return convert
+
+    def _fetch_children(self, steps, rows, request, children):
+        for name, index, conv, kind in steps:
+            if kind == MANY:
+                parent_ids = {row[index] for row in rows if row[index] is not None}
+                children[id(conv)] = conv._serialize_grouped(parent_ids, request)
+            elif kind == NESTED:
+                self._fetch_children(conv, rows, request, children)
+
+    def _serialize_grouped(self, parent_ids, request):
+        relation_lookup = self.lookups[self.parent_index]
+        queryset = self.model._default_manager.filter(**{f'{relation_lookup}__in': parent_ids})
+        rows = list(queryset.values_list(*self.lookups))
+        children = {}
+        self._fetch_children(self.steps, rows, request, children)
+
+        grouped = defaultdict(list)
+        parent_index = self.parent_index
+        for row in rows:
+            grouped[row[parent_index]].append(self._build(self.steps, row, request, children))
+        return grouped
+
+    def _build(self, steps, row, request, children):
+        ret = {}
+        for name, index, conv, kind in steps:
+            value = row[index]
+            if kind == VALUE:
+                ret[name] = value if value is None or conv is None else conv(value)
+            elif kind == FILE:
+                if not value:
+                    ret[name] = None
+                elif request is not None:
+                    ret[name] = request.build_absolute_uri(conv.url(value))
+                else:
+                    ret[name] = conv.url(value)
+            elif kind == NESTED:
+                ret[name] = None if value is None else self._build(conv, row, request, children)
+            else:
+                ret[name] = children[id(conv)].get(value, [])
+        return ret
+
+    def serialize(self, queryset, request=None):
+        """
+        Render every row of `queryset` like `serializer_class(many=True).data`.
+        Filters, annotations and ordering on the queryset are kept.
+        """
+        if not self._compiled:
+            self._compile()
+        rows = list(queryset.prefetch_related(None).values_list(*self.lookups))
+        children = {}
+        self._fetch_children(self.steps, rows, request, children)
+        steps = self.steps
+        return [self._build(steps, row, request, children) for row in rows]
@@ -0,0 +1,172 @@
+"""
+A small database-backed job queue.
+
+Side effects that don't need to finish inside the request are registered as
+tasks and enqueued instead of being run inline:
+
+    @task(concurrency=1)
+    def refresh_feeds(names):
+        ...
+
+    refresh_feeds.enqueue(names)
+
+`enqueue` inserts a Job row inside the caller's transaction, so a worker
+only sees it once the request commits and never sees it if the request
+rolls back - the same guarantee as `transaction.on_commit`, but durable.
+Jobs are executed by `manage.py run_jobs`; no broker is needed.
+
+Settings:
+    JOBS_EAGER          Run jobs in-process on commit instead (local dev).
+    JOBS_LOCK_TIMEOUT   Seconds before a job stuck in 'running' is retried.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+_discovered = False
+
+
+class Task:
+    def __init__(self, func, max_attempts, concurrency):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, run_at=None, **kwargs):
+        """Queue a call with JSON-serializable arguments."""
+        job = Job.objects.create(
+            name=self.name, args=list(args), kwargs=kwargs,
+            max_attempts=self.max_attempts, run_at=run_at or timezone.now(),
+        )
+        if getattr(settings, 'JOBS_EAGER', False):
+            transaction.on_commit(lambda: run_pending(names=[self.name]))
+        return job
+
+
+def task(func=None, *, max_attempts=5, concurrency=None):
+    """
+    Register a function as a background task.
+    `concurrency` caps how many jobs of this task run at once across workers.
+    """
+    def decorator(func):
+        registered = Task(func, max_attempts, concurrency)
+        _registry[registered.name] = registered
+        return registered
+    return decorator(func) if func is not None else decorator
+
+
+def get_task(name):
+    global _discovered
+    if name not in _registry and not _discovered:
+        autodiscover_modules('tasks')
+        _discovered = True
+    return _registry.get(name)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 2s, 4s, 8s, ... capped at an hour."""
+    return timedelta(seconds=min(2 ** attempts, 3600))
+
+
+def requeue_stale():
+    """Put jobs whose worker died mid-run back in the queue."""
+    timeout = getattr(settings, 'JOBS_LOCK_TIMEOUT', 300)
+    return Job.objects.filter(
+        status=Job.Status.RUNNING, locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status=Job.Status.QUEUED, locked_at=None)
+
+
+def claim(limit, names=None):
+    """
+    Claim up to `limit` due jobs for this worker.
+
+    Each job is claimed with a conditional UPDATE on its status, so two
+    workers can never run the same job, on any database backend.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.Status.QUEUED, run_at__lte=now).order_by('run_at')
+    if names is not None:
+        candidates = candidates.filter(name__in=names)
+
+    claimed = []
+    for job in candidates[:limit * 4]:
+        if len(claimed) >= limit:
+            break
+        registered = get_task(job.name)
+        if registered is not None and registered.concurrency is not None:
+            won = _claim_capped(job, registered.concurrency, now)
+        else:
+            won = _claim(job, now)
+        if won:
+            job.status, job.locked_at, job.attempts = Job.Status.RUNNING, now, job.attempts + 1
+            claimed.append(job)
+    return claimed
+
+
+def _claim(job, now):
+    return Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(
+        status=Job.Status.RUNNING, locked_at=now, attempts=job.attempts + 1,
+    )
+
+
+def _claim_capped(job, concurrency, now):
+    """
+    Claim `job` only while fewer than `concurrency` jobs of its task run.
+    Workers lock the task's queued and running rows first, so concurrent
+    claims for the same task take turns and each sees the others' claims.
+    """
+    with transaction.atomic():
+        statuses = Job.objects.select_for_update().filter(
+            name=job.name, status__in=[Job.Status.QUEUED, Job.Status.RUNNING],
+        ).order_by('pk').values_list('status', flat=True)
+        if sum(status == Job.Status.RUNNING for status in statuses) >= concurrency:
+            return 0
+        return _claim(job, now)
+
+
+def execute(job):
+    """Run a claimed job, then delete it or schedule a retry."""
+    registered = get_task(job.name)
+    try:
+        if registered is None:
+            raise LookupError(f'Unknown task {job.name!r}')
+        with transaction.atomic():
+            registered.func(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.name, job.attempts)
+        failed = job.attempts >= job.max_attempts or registered is None
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.Status.FAILED if failed else Job.Status.QUEUED,
+            run_at=timezone.now() + retry_delay(job.attempts),
+            locked_at=None,
+            last_error=traceback.format_exc(),
+        )
+        return False
+    Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def run_pending(limit=100, names=None):
+    """Claim and run due jobs in the current thread. Returns how many ran."""
+    ran = 0
+    while True:
+        jobs = claim(limit, names=names)
+        if not jobs:
+            return ran
+        for job in jobs:
+            execute(job)
+            ran += 1
@@ -0,0 +1,52 @@
+import gzip
+import time
+
+import brotli
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from products.models import Product
+from products.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering time and bytes on the wire for the catalog and order lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Render each payload this many times')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        payloads = {
+            'catalog': ProductSerializer(
+                Product.objects.filter(is_active=True).select_related('category'), many=True
+            ).data,
+            'orders': OrderSerializer(
+                Order.objects.select_related('user').prefetch_related('items__product__category'), many=True
+            ).data,
+        }
+
+        for name, data in payloads.items():
+            self.stdout.write(f"\n{name} ({len(data)} rows)")
+            baseline = None
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    body = renderer.render(data)
+                elapsed = (time.perf_counter() - start) / iterations * 1000
+
+                if baseline is None:
+                    baseline = body
+                elif body != baseline:
+                    self.stdout.write(self.style.WARNING('  output differs from JSONRenderer'))
+
+                self.stdout.write(f"  {renderer.__class__.__name__:<18} {elapsed:8.3f} ms/render")
+
+            self.stdout.write(f"  identity           {len(baseline):8d} bytes")
+            self.stdout.write(f"  gzip               {len(gzip.compress(baseline, compresslevel=6)):8d} bytes")
+            self.stdout.write(f"  br                 {len(brotli.compress(baseline, quality=5)):8d} bytes")
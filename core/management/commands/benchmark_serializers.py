@@ -0,0 +1,83 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.fast_serializers import ValuesPlan
+from orders.models import Order, OrderItem
+from orders.serializers import OrderSerializer
+from products.models import Category, Product
+from products.serializers import ProductSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare ModelSerializer and ValuesPlan rendering speed per 1k rows (fixtures are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Number of products and orders to generate')
+        parser.add_argument('--items', type=int, default=3, help='Order items per order')
+        parser.add_argument('--repeat', type=int, default=5, help='Best of N runs')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.create_fixtures(options['rows'], options['items'])
+                self.run(options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_fixtures(self, rows, items):
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'bench-{tag}', slug=f'bench-{tag}')
+        products = Product.objects.bulk_create(
+            Product(category=category, name=f'Product {i}', slug=f'bench-{tag}-{i}', description='x' * 200,
+                    image=f'products/bench-{i}.jpg', price=Decimal('19.99'), sku=f'B-{tag}-{i}')
+            for i in range(rows)
+        )
+        user = get_user_model().objects.create_user(f'bench-{tag}', f'bench-{tag}@example.com')
+        orders = Order.objects.bulk_create(
+            Order(user=user, total_amount=Decimal('59.97'), shipping_address='a', billing_address='b')
+            for _ in range(rows)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=products[(n + i) % rows], quantity=1,
+                      price_at_time=Decimal('19.99'), subtotal=Decimal('19.99'))
+            for n, order in enumerate(orders) for i in range(items)
+        )
+        self.category, self.user, self.rows = category, user, rows
+
+    def run(self, repeat):
+        cases = [
+            ('products', ProductSerializer,
+             Product.objects.filter(category=self.category).select_related('category')),
+            ('orders', OrderSerializer,
+             Order.objects.filter(user=self.user).select_related('user').prefetch_related('items__product__category')),
+        ]
+        for name, serializer_class, queryset in cases:
+            plan = ValuesPlan(serializer_class)
+            plan.serialize(queryset.none())  # compile outside the timed loop
+
+            slow = self.best_of(repeat, lambda: serializer_class(queryset.all(), many=True).data)
+            fast = self.best_of(repeat, lambda: plan.serialize(queryset.all()))
+            per_1k = 1000 / self.rows
+            self.stdout.write(
+                f"{name:<9} ModelSerializer {slow * per_1k * 1000:9.1f} ms/1k rows   "
+                f"ValuesPlan {fast * per_1k * 1000:9.1f} ms/1k rows   ({slow / fast:.1f}x)"
+            )
+
+    @staticmethod
+    def best_of(repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: loading the WSGI module runs django.setup()
+# (settings, app registry, models); the URLconf (views, serializers) is
+# otherwise only imported by the first request.
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {wsgi}
+ready = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls = time.perf_counter()
+from django.apps import apps
+sys.stdout.write(json.dumps({{
+    'setup': ready - start, 'urls': urls - ready,
+    'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'apps': [config.name for config in apps.get_app_configs()],
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure WSGI startup: per-module import cost, app-ready and URLconf time, and peak RSS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Slowest modules and packages to list')
+        parser.add_argument('--repeat', type=int, default=3, help='Best of N fresh interpreters for the timings')
+        parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                            help='Extra environment for the measured process, e.g. AUTH_INTEGRATIONS=allauth')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'fitsupply_backend.settings'))
+        for item in options['env']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'--env expects NAME=VALUE, got {item!r}')
+            env[name] = value
+        wsgi = settings.WSGI_APPLICATION.rpartition('.')[0]
+
+        runs = [self.measure(wsgi, env) for _ in range(max(options['repeat'], 1))]
+        result, imports = min(runs, key=lambda run: run[0]['setup'] + run[0]['urls'])
+
+        self.stdout.write(f"{wsgi}: {len(result['apps'])} apps")
+        if options['verbosity'] > 1:
+            self.stdout.write(f"  {', '.join(result['apps'])}")
+        self.stdout.write(f"  app registry ready  {result['setup'] * 1000:8.1f} ms")
+        self.stdout.write(f"  URLconf loaded      {result['urls'] * 1000:8.1f} ms")
+        self.stdout.write(f"  peak RSS            {result['maxrss_kb'] / 1024:8.1f} MB")
+        self.stdout.write(f"  modules imported    {len(imports):8d}")
+
+        self.stdout.write("\nSlowest modules (cumulative, incl. submodules):")
+        for module, (_, cumulative) in sorted(imports.items(), key=lambda item: -item[1][1])[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:8.1f} ms  {module}')
+
+        packages = defaultdict(int)
+        for module, (own, _) in imports.items():
+            packages[module.partition('.')[0]] += own
+        self.stdout.write("\nSlowest top-level packages (own time of all their modules):")
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {own / 1000:8.1f} ms  {package}')
+
+    @staticmethod
+    def measure(wsgi, env):
+        """Return `(result, {module: (self_us, cumulative_us)})` from one fresh interpreter."""
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD.format(wsgi=wsgi)],
+            env=env, capture_output=True, text=True, cwd=settings.BASE_DIR,
+        )
+        if process.returncode:
+            raise CommandError(f'Startup failed:\n{process.stderr[-2000:]}')
+        imports = {}
+        for line in process.stderr.splitlines():
+            # "import time:       123 |        456 |   package.module"
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            own, cumulative, module = line[len('import time:'):].split('|')
+            imports[module.strip()] = (int(own), int(cumulative))
+        return json.loads(process.stdout), imports
@@ -0,0 +1,65 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backfill import get_backfill, get_backfills
+
+
+class Command(BaseCommand):
+    help = 'Run registered backfills in resumable, keyset-paginated batches (see core.backfill)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Backfills to run (default: list them)')
+        parser.add_argument('--batch-size', type=int, help="Rows per batch (default: the backfill's own)")
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches; rerun to resume')
+        parser.add_argument('--restart', action='store_true', help='Discard the checkpoint and start from the first row')
+
+    def handle(self, *args, **options):
+        if not options['names']:
+            for name, registered in get_backfills().items():
+                checkpoint = registered.checkpoint()
+                state = 'done' if checkpoint.finished_at else f'{registered.remaining(checkpoint):,} rows left'
+                self.stdout.write(f'{name:<40} {checkpoint.rows_done:>12,} rows processed   {state}')
+            return
+
+        backfills = [get_backfill(name) for name in options['names']]
+        unknown = [name for name, registered in zip(options['names'], backfills) if registered is None]
+        if unknown:
+            raise CommandError(f"Unknown backfill(s): {', '.join(unknown)}. Run without arguments to list them.")
+
+        for registered in backfills:
+            if options['restart']:
+                registered.reset()
+            self.run(registered, options)
+
+    def run(self, registered, options):
+        checkpoint = registered.checkpoint()
+        done_before = checkpoint.rows_done
+        total = done_before + registered.remaining(checkpoint)
+        start = last_report = time.monotonic()
+
+        def progress(checkpoint):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= 1:
+                last_report = now
+                self.report(registered.name, checkpoint.rows_done, total, checkpoint.rows_done - done_before, now - start)
+
+        checkpoint = registered.run(
+            batch_size=options['batch_size'], sleep=options['sleep'],
+            max_batches=options['max_batches'], progress=progress,
+        )
+        self.report(checkpoint.name, checkpoint.rows_done, total, checkpoint.rows_done - done_before,
+                    time.monotonic() - start)
+        if checkpoint.finished_at:
+            self.stdout.write(self.style.SUCCESS(f'{checkpoint.name} finished.'))
+        else:
+            self.stdout.write(f'{checkpoint.name} stopped at pk {checkpoint.last_pk}; rerun to resume.')
+
+    def report(self, name, done, total, processed, elapsed):
+        rate = processed / elapsed if elapsed else 0
+        eta = timedelta(seconds=round((total - done) / rate)) if rate and total > done else timedelta(0)
+        percent = done / total * 100 if total else 100
+        self.stdout.write(f'{name}: {done:,}/{total:,} rows ({percent:.1f}%)  {rate:,.0f} rows/s  ETA {eta}')
@@ -0,0 +1,70 @@
+import logging
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core import jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (see core.jobs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Worker threads')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.once = options['once']
+        self.poll_interval = options['poll_interval']
+
+        jobs.requeue_stale()
+        workers = [
+            threading.Thread(target=self.work, name=f'job-worker-{n}', daemon=True)
+            for n in range(options['concurrency'])
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(timeout=self.poll_interval)
+                if not self.once:
+                    jobs.requeue_stale()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the current jobs...')
+            self.stop.set()
+            for worker in workers:
+                worker.join()
+        finally:
+            close_old_connections()
+
+    def work(self):
+        try:
+            while not self.stop.is_set():
+                try:
+                    claimed = jobs.claim(1)
+                    if not claimed:
+                        if self.once:
+                            return
+                        self.stop.wait(self.poll_interval)
+                        continue
+                    job = claimed[0]
+                    ok = jobs.execute(job)
+                    self.stdout.write(f"[{job.name}] #{job.pk} {'done' if ok else 'failed'} (attempt {job.attempts})")
+                except Exception:
+                    # e.g. the database went away; a job left 'running' is requeued as stale
+                    logger.exception('Job worker error, retrying in %ss', self.poll_interval)
+                    if self.once:
+                        return
+                    connection.close()
+                    self.stop.wait(self.poll_interval)
+                finally:
+                    close_old_connections()
+        finally:
+            connection.close()
@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from functools import partial
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from analytics.views import MAX_CHART_DAYS, sales_metric
+from products import cache as product_cache, feeds
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Pre-populate the storefront feeds, product cache and dashboard sales metrics after a deploy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Threads (each uses its own database connection)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Products cached per key')
+        parser.add_argument('--strict', action='store_true', help='Exit with an error status if any key fails')
+
+    def handle(self, *args, **options):
+        # Every step only fills in missing or stale entries the same way a
+        # request would, so it's safe to run next to live traffic.
+        if isinstance(caches['default'], LocMemCache):
+            self.stderr.write('The default cache is local to this process: only the sales metrics will persist.')
+        work = self.plan(options['chunk_size'])
+        start = time.perf_counter()
+        failed = []
+        for key, elapsed, error in self.run(work, options['workers']):
+            if error is None:
+                self.stdout.write(f'{key:<40} {elapsed * 1000:9.1f} ms')
+            else:
+                failed.append(key)
+                self.stderr.write(f'{key:<40} failed: {error}')
+
+        summary = f'Warmed {len(work) - len(failed)}/{len(work)} keys in {time.perf_counter() - start:.1f}s.'
+        if failed and options['strict']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary) if not failed else self.style.WARNING(summary))
+
+    def plan(self, chunk_size):
+        """`(key, callable)` pairs; feeds first, as they back the busiest pages."""
+        work = [(f'feed:{name}', partial(feeds.refresh, name)) for name in feeds.names()]
+
+        product_ids = list(Product.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+        for i in range(0, len(product_ids), chunk_size):
+            chunk = product_ids[i:i + chunk_size]
+            work.append((f'products:{chunk[0]}-{chunk[-1]}', partial(product_cache.get_many, 'id', chunk)))
+
+        # Past days only: today's metric would be frozen half-way through the day
+        today = timezone.now().date()
+        for days_ago in range(MAX_CHART_DAYS - 1, 0, -1):
+            date = today - timedelta(days=days_ago)
+            work.append((f'sales-metric:{date}', partial(sales_metric, date)))
+        return work
+
+    def run(self, work, workers):
+        """Yield `(key, seconds, error)` as each key finishes."""
+        if workers <= 1:
+            for key, func in work:
+                yield self.timed(key, func)
+            return
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='warm-cache') as pool:
+            futures = [pool.submit(self.in_thread, key, func) for key, func in work]
+            for future in as_completed(futures):
+                yield future.result()
+
+    @staticmethod
+    def timed(key, func):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as exc:
+            return key, time.perf_counter() - start, exc
+        return key, time.perf_counter() - start, None
+
+    def in_thread(self, key, func):
+        close_old_connections()
+        try:
+            return self.timed(key, func)
+        finally:
+            connection.close()
@@ -0,0 +1,64 @@
+import brotli
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_string
+
+re_accepts_gzip = _lazy_re_compile(r"\bgzip\b")
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+
+
+class APICompressionMiddleware:
+    """
+    Compress JSON API responses above API_COMPRESSION_MIN_SIZE bytes.
+
+    Brotli is preferred when the client accepts it, otherwise gzip is used.
+    Static files are left to whitenoise, which serves them pre-compressed.
+    """
+    # Same BREACH mitigation as django.middleware.gzip.GZipMiddleware.
+    max_random_bytes = 100
+    brotli_quality = 5
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith('application/json'):
+            return response
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        ae = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if re_accepts_br.search(ae):
+            encoding = 'br'
+            compressed_content = brotli.compress(response.content, quality=self.brotli_quality)
+        elif re_accepts_gzip.search(ae):
+            encoding = 'gzip'
+            compressed_content = compress_string(
+                response.content,
+                max_random_bytes=self.max_random_bytes,
+            )
+        else:
+            return response
+
+        # Return the compressed content only if it's actually shorter.
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,30 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over very large tables.
+
+    COUNT(*) on an unfiltered PostgreSQL table scans every row; the
+    planner's estimate from pg_class is used instead once it's above
+    `exact_below`. Filtered or searched lists, small tables and other
+    databases are counted exactly.
+    """
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[getattr(queryset, 'db', 'default')]
+        if connection.vendor == 'postgresql' and hasattr(queryset, 'query') and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.exact_below:
+                return row[0]
+        return super().count
@@ -0,0 +1,35 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer backed by orjson.
+
+    Produces the same bytes as the default renderer for compact output.
+    Types orjson doesn't handle natively (Decimal, lazy strings, ...) and
+    datetimes go through DRF's encoder, so UTC still renders as 'Z' and
+    serializer DecimalFields stay strings (COERCE_DECIMAL_TO_STRING).
+    Indented output (e.g. the browsable API) falls back to the stdlib encoder.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if not self.compact or self.ensure_ascii or \
+                self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.default, option=self.options)
+
+        # Keep the output a strict javascript subset, like JSONRenderer does.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
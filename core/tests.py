@@ -1,3 +1,280 @@
-from django.test import TestCase
+import gzip
+import json
+import threading
+import uuid
+from datetime import date, datetime, time as dt_time, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import brotli
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from analytics.models import SalesMetric
+from analytics.views import MAX_CHART_DAYS
+from products import feeds
+from products.models import Category, Product
+from . import jobs
+from .backfill import backfill
+from .management.commands import run_jobs
+from .middleware import APICompressionMiddleware
+from .models import BackfillCheckpoint, Job
+from .renderers import FastJSONRenderer
+
+calls = []
+
+
+@jobs.task(max_attempts=2)
+def flaky(value):
+    calls.append(value)
+    if value == 'boom':
+        raise RuntimeError(value)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_output_matches_json_renderer(self):
+        data = {
+            'price': Decimal('19.90'), 'raw_total': Decimal('7.1800'), 'id': uuid.UUID(int=7),
+            'created': datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+            'day': date(2026, 1, 2), 'at': dt_time(3, 4, 5), 'label': gettext_lazy('Products'),
+            'text': 'Ünïcode \u2028 separators \u2029', 'nested': [{1: None, 'ok': True, 'ratio': 0.5}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indented_output_falls_back_to_json_renderer(self):
+        data = {'price': Decimal('1.50')}
+        context = {'indent': 2}
+        self.assertEqual(FastJSONRenderer().render(data, renderer_context=context),
+                         JSONRenderer().render(data, renderer_context=context))
+
+
+@override_settings(API_COMPRESSION_MIN_SIZE=200)
+class APICompressionMiddlewareTests(SimpleTestCase):
+    body = json.dumps([{'name': f'Product {n}', 'price': '9.99'} for n in range(50)]).encode()
+
+    def respond(self, accept_encoding='', body=None, content_type='application/json'):
+        middleware = APICompressionMiddleware(
+            lambda request: HttpResponse(self.body if body is None else body, content_type=content_type)
+        )
+        return middleware(RequestFactory().get('/api/v1/products/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_prefers_brotli(self):
+        response = self.respond('gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_falls_back_to_gzip(self):
+        response = self.respond('gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_uncompressed_when_not_accepted(self):
+        response = self.respond('identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.body)
+        # Another client could have received a compressed copy
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_small_and_non_json_responses_are_left_alone(self):
+        for response in (self.respond('br, gzip', body=b'[1, 2, 3]'),
+                         self.respond('br, gzip', content_type='text/html')):
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertFalse(response.has_header('Vary'))
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_successful_jobs_run_once_and_are_deleted(self):
+        flaky.enqueue('ok')
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, ['ok'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failing_jobs_retry_with_backoff_then_fail(self):
+        job = flaky.enqueue('boom')
+        with self.assertLogs('core.jobs', level='ERROR'):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.QUEUED, 1))
+        self.assertIn('RuntimeError', job.last_error)
+
+        # Not due yet
+        self.assertEqual(jobs.run_pending(), 0)
+        Job.objects.update(run_at=job.created_at)
+        with self.assertLogs('core.jobs', level='ERROR'):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+
+    def test_concurrency_limit(self):
+        limited = jobs.Task(lambda: None, max_attempts=1, concurrency=1)
+        limited.name = 'core.tests.limited'
+        jobs._registry[limited.name] = limited
+        self.addCleanup(jobs._registry.pop, limited.name)
+        limited.enqueue()
+        limited.enqueue()
+
+        self.assertEqual(len(jobs.claim(10)), 1)
+        self.assertEqual(jobs.claim(10), [])
+
+    @mock.patch.object(run_jobs, 'close_old_connections')
+    @mock.patch.object(run_jobs, 'connection')
+    def test_worker_keeps_polling_after_errors(self, connection, close_old_connections):
+        command = run_jobs.Command(stdout=StringIO())
+        command.stop, command.once, command.poll_interval = threading.Event(), False, 0
+        flaky.enqueue('ok')
+        outcomes = [DatabaseError('gone'), jobs.claim]
+
+        def claim(count):
+            if not outcomes:
+                command.stop.set()
+                return []
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome(count)
+
+        with mock.patch.object(jobs, 'claim', claim), self.assertLogs(run_jobs.logger, level='ERROR'):
+            command.work()
+        self.assertEqual(calls, ['ok'])
+
+
+class JobTransactionTests(TransactionTestCase):
+    def test_jobs_from_rolled_back_transactions_never_run(self):
+        try:
+            with transaction.atomic():
+                flaky.enqueue('lost')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'anon': '3/min', 'user': '10/min'},
+})
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_buckets_are_per_client_and_route(self):
+        client = APIClient()
+        for _ in range(3):
+            self.assertEqual(client.get('/api/v1/products/').status_code, 200)
+        response = client.get('/api/v1/products/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')
+
+        self.assertEqual(client.get('/api/v1/categories/').status_code, 200)
+        self.assertEqual(APIClient(REMOTE_ADDR='10.0.0.2').get('/api/v1/products/').status_code, 200)
+
+    def test_expensive_requests_cost_more(self):
+        staff = get_user_model().objects.create_user('ops', 'ops@example.com', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+
+        # 63 days cost 9 of the 10 tokens
+        self.assertEqual(client.get('/api/v1/dashboard/sales-chart/', {'days': 63}).status_code, 200)
+        self.assertEqual(client.get('/api/v1/dashboard/sales-chart/', {'days': 14}).status_code, 429)
+        self.assertEqual(client.get('/api/v1/dashboard/sales-chart/', {'days': 7}).status_code, 200)
+
+        self.assertEqual(client.get('/api/v1/dashboard/recent-orders/', {'limit': 0}).status_code, 400)
+        self.assertEqual(client.get('/api/v1/dashboard/recent-orders/', {'limit': 1000}).status_code, 400)
+        self.assertEqual(client.get('/api/v1/dashboard/recent-orders/', {'limit': 100}).status_code, 200)
+
+
+@backfill(Job.objects.filter(last_error=''), batch_size=2)
+def mark_jobs(batch):
+    if batch.filter(name='crash').exists():
+        raise RuntimeError('crash')
+    batch.update(last_error='seen')
+
+
+class BackfillTests(TestCase):
+    def setUp(self):
+        self.jobs = Job.objects.bulk_create(Job(name=f'job-{n}') for n in range(5))
+
+    def test_batches_resume_from_the_checkpoint(self):
+        Job.objects.filter(pk=self.jobs[3].pk).update(name='crash')
+        with self.assertRaises(RuntimeError):
+            mark_jobs.run()
+        checkpoint = BackfillCheckpoint.objects.get(name='core.tests.mark_jobs')
+        self.assertEqual((checkpoint.last_pk, checkpoint.rows_done), (self.jobs[1].pk, 2))
+        self.assertEqual(Job.objects.filter(last_error='seen').count(), 2)
+
+        Job.objects.filter(pk=self.jobs[3].pk).update(name='fixed')
+        seen = []
+        checkpoint = mark_jobs.run(progress=lambda checkpoint: seen.append(checkpoint.last_pk))
+        self.assertEqual(seen, [self.jobs[3].pk, self.jobs[4].pk])
+        self.assertEqual(checkpoint.rows_done, 5)
+        self.assertIsNotNone(checkpoint.finished_at)
+        self.assertFalse(Job.objects.exclude(last_error='seen').exists())
+
+    def test_command_runs_in_limited_batches(self):
+        out = StringIO()
+        call_command('run_backfill', 'core.tests.mark_jobs', '--batch-size', '1', '--max-batches', '3', stdout=out)
+        self.assertIn('3/5 rows', out.getvalue())
+        self.assertIn('rerun to resume', out.getvalue())
+        self.assertEqual(Job.objects.filter(last_error='seen').count(), 3)
+
+        call_command('run_backfill', 'core.tests.mark_jobs', '--restart', stdout=out)
+        self.assertEqual(BackfillCheckpoint.objects.get().rows_done, 2)
+        with self.assertRaises(CommandError):
+            call_command('run_backfill', 'nope', stdout=out)
+
+
+class WarmCachesTests(TestCase):
+    def test_primes_feeds_products_and_metrics(self):
+        cache.clear()
+        category = Category.objects.create(name='Warm', slug='warm')
+        product = Product.objects.create(
+            category=category, name='Warm', slug='warm', description='x', price='1.00', sku='FS-W', is_featured=True,
+        )
+        out = StringIO()
+        err = StringIO()
+        call_command('warm_caches', '--workers', '1', stdout=out, stderr=err)
+
+        self.assertIn(f'feed:best-sellers:{category.pk}', out.getvalue())
+        self.assertEqual([card['slug'] for card in cache.get('feed:featured')['items']], ['warm'])
+        self.assertEqual(cache.get(f'product:{product.pk}')['sku'], 'FS-W')
+        # Every past day of the chart, not today
+        self.assertEqual(SalesMetric.objects.count(), MAX_CHART_DAYS - 1)
+        # Each feed, one chunk of products, each metric
+        keys = len(feeds.names()) + 1 + MAX_CHART_DAYS - 1
+        self.assertIn(f'Warmed {keys}/{keys} keys', out.getvalue())
+        self.assertIn('local to this process', err.getvalue())
+
+
+class ProfileStartupTests(TestCase):
+    def apps(self, integrations):
+        out = StringIO()
+        call_command('profile_startup', '--repeat', '1', '--top', '5', '--env', f'AUTH_INTEGRATIONS={integrations}',
+                     verbosity=2, stdout=out)
+        self.assertIn('app registry ready', out.getvalue())
+        return out.getvalue().splitlines()[1].strip().split(', ')
+
+    def test_integrations_load_only_when_configured(self):
+        default = self.apps('')
+        self.assertIn('rest_framework_simplejwt', default)
+        self.assertNotIn('rest_framework.authtoken', default)
+        self.assertNotIn('allauth', default)
+        self.assertIn('rest_framework.authtoken', self.apps('authtoken'))
+
+    def test_rejects_malformed_env(self):
+        with self.assertRaises(CommandError):
+            call_command('profile_startup', '--env', 'AUTH_INTEGRATIONS', stdout=StringIO())
@@ -0,0 +1,114 @@
+"""
+Token-bucket rate limiting per client and route.
+
+Each client (user id, or IP for anonymous requests) gets one bucket per
+route (URL name). A bucket holds up to N tokens for a rate of "N/period"
+and refills continuously; a request spends `throttle_cost` tokens (1 by
+default) and is rejected with 429 and Retry-After when the bucket can't
+cover it. Expensive views declare a higher cost:
+
+    class DashboardSummaryView(APIView):
+        throttle_cost = 5
+
+    @throttle_cost(lambda request: ...)   # above @api_view
+    @api_view(['GET'])
+    def sales_chart_data(request): ...
+
+Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']: 'user' and
+'anon', or the view's `throttle_scope` if set. Buckets live in the cache
+named by THROTTLE_CACHE: Redis limits across processes, the in-process
+'local' cache per worker. Never point it at the database cache; every
+request would write to it. Updates aren't atomic, so concurrent requests may
+occasionally get one extra token, as with DRF's own throttles.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'120/min' -> (120, 60)"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def throttle_cost(cost):
+    """
+    Declare the token cost of a view: an int, or a callable taking the
+    request. Apply above @api_view for function views.
+    """
+    def decorator(view):
+        setattr(getattr(view, 'cls', view), 'throttle_cost', staticmethod(cost) if callable(cost) else cost)
+        return view
+    return decorator
+
+
+def capped_int(request, name, default, minimum, maximum):
+    """Read an integer query parameter, rejecting values outside [minimum, maximum] with a 400."""
+    raw = request.query_params.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValidationError({name: 'A valid integer is required.'})
+    if not minimum <= value <= maximum:
+        raise ValidationError({name: f'Must be between {minimum} and {maximum}.'})
+    return value
+
+
+class TokenBucketThrottle(BaseThrottle):
+    def __init__(self):
+        self.retry_after = None
+
+    def get_rate(self, request, view):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        scope = getattr(view, 'throttle_scope', None)
+        if scope in rates:
+            return rates[scope]
+        return rates.get('user' if request.user and request.user.is_authenticated else 'anon')
+
+    def get_cost(self, request, view):
+        cost = getattr(view, 'throttle_cost', 1)
+        return cost(request) if callable(cost) else cost
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            client = f'user:{request.user.pk}'
+        else:
+            client = f'ip:{self.get_ident(request)}'
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else type(view).__name__
+        return f'throttle:{route}:{client}'
+
+    def allow_request(self, request, view):
+        rate = self.get_rate(request, view)
+        if rate is None:
+            return True
+        capacity, period = parse_rate(rate)
+        refill = capacity / period
+        cost = min(self.get_cost(request, view), capacity)
+
+        cache = caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+        key = self.get_cache_key(request, view)
+        now = time.time()
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        else:
+            self.retry_after = math.ceil((cost - tokens) / refill)
+        cache.set(key, (tokens, now), period)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
@@ -1,3 +1,50 @@
-from django.shortcuts import render
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
 
-# Create your views here.
+
+class FastReadMixin:
+    """
+    Serve `list` and `retrieve` from a precompiled ValuesPlan.
+
+    Set `fast_read_plan` (or override `get_fast_read_plan`) on a viewset.
+    Paginated viewsets and viewsets with object-level permissions fall back
+    to the regular serializer path.
+    """
+    fast_read_plan = None
+
+    def get_fast_read_plan(self):
+        return self.fast_read_plan
+
+    def has_object_level_permissions(self):
+        return any(
+            type(permission).has_object_permission is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_fast_read_plan()
+        if plan is None or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(plan.serialize(queryset, request=request))
+
+    def retrieve(self, request, *args, **kwargs):
+        plan = self.get_fast_read_plan()
+        if plan is None or self.has_object_level_permissions():
+            return super().retrieve(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            rows = plan.serialize(
+                queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}),
+                request=request,
+            )
+        except (TypeError, ValueError, DjangoValidationError):
+            rows = None
+        if not rows:
+            raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+        return Response(rows[0])
@@ -45,7 +45,6 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
     'django_filters',
-    'rest_framework.authtoken',
 
     # apps
     'core.apps.CoreConfig',
@@ -66,10 +65,29 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # Token buckets per user/IP and route, see core.throttling
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.TokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '300/min',
+        'user': '1200/min',
+    },
 }
 
+# Cache alias holding throttle buckets, read and written on every API request.
+# With Redis they're shared, so limits hold across workers. Otherwise they use
+# the in-process 'local' cache (see CACHES): each worker enforces the rates on
+# its own, but a request never costs a database write for its bucket.
+THROTTLE_CACHE = 'default' if 'REDIS_URL' in os.environ else 'local'
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'core.middleware.APICompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -103,8 +121,7 @@ WSGI_APPLICATION = 'fitsupply_backend.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-from decouple import config
-import dj_database_url
+from decouple import Csv, config
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -112,6 +129,7 @@ DATABASES = {
     }
 }
 if 'DATABASE_URL' in os.environ:
+    import dj_database_url
     DATABASES = {
         'default': dj_database_url.config(
             conn_max_age=600,
@@ -120,6 +138,49 @@ if 'DATABASE_URL' in os.environ:
         )
     }
 
+# Cache
+# 'default' holds feeds, product rows and warm_caches entries. They are
+# written by one process (a web worker, run_jobs, warm_caches) and read by
+# the others, and invalidations must reach every worker, so production needs
+# a cache shared between processes: set REDIS_URL. CACHE_BACKEND=database
+# opts in to the database cache table instead (`manage.py createcachetable`,
+# run by build.sh); it needs no extra service, but every cache write is a
+# database transaction. Without either, each process has its own LocMemCache.
+# 'local' is always in-process, for per-request users that must not cost a
+# query when the shared cache is the database.
+if 'REDIS_URL' in os.environ:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+elif os.environ.get('CACHE_BACKEND') == 'database':
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    }
+else:
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'OPTIONS': {'MAX_ENTRIES': 50000}}
+CACHES = {
+    'default': SHARED_CACHE,
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'local'},
+}
+
+
+# Optional auth integrations, e.g. AUTH_INTEGRATIONS=authtoken,allauth.
+# The API authenticates with simplejwt; these apps (and their imports,
+# models and middleware) are only loaded when listed, which keeps them
+# out of every worker's startup time and memory. See profile_startup.
+#   authtoken  rest_framework.authtoken (DRF's TokenAuthentication)
+#   allauth    django-allauth accounts
+AUTH_INTEGRATIONS = config('AUTH_INTEGRATIONS', default='', cast=Csv())
+if 'authtoken' in AUTH_INTEGRATIONS:
+    INSTALLED_APPS += ['rest_framework.authtoken']
+if 'allauth' in AUTH_INTEGRATIONS:
+    INSTALLED_APPS += ['django.contrib.sites', 'allauth', 'allauth.account']
+    MIDDLEWARE += ['allauth.account.middleware.AccountMiddleware']
+    SITE_ID = 1
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,6 +200,20 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (accounts.hashers). The PBKDF2 iteration count comes from
+# a named profile; stored hashes are upgraded on the next login after a change.
+# Compare profiles with `python manage.py benchmark_auth`.
+PASSWORD_HASHERS = [
+    'accounts.hashers.ProfiledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_PROFILE = config('PASSWORD_HASH_PROFILE', default='default')
+# Concurrent hashes per process; extra logins and registrations queue for a thread.
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=os.cpu_count() or 2, cast=int)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -171,6 +246,40 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
     "http://localhost:5173",
 ]
+# Guest carts are kept in a cookie, which cross-origin frontends must send along.
+CORS_ALLOW_CREDENTIALS = True
+
+# JSON API responses smaller than this (in bytes) are sent uncompressed.
+# Clients that accept it get Brotli (the `brotli` package is required), others gzip.
+API_COMPRESSION_MIN_SIZE = 1024
+
+# Background jobs (core.jobs), executed by `python manage.py run_jobs`.
+# With JOBS_EAGER the web process runs them itself right after commit.
+JOBS_EAGER = False
+JOBS_LOCK_TIMEOUT = 300
+
+# Guest carts (orders.guest_cart) live in a signed cookie until login.
+GUEST_CART_MAX_ITEMS = 50
+GUEST_CART_MAX_AGE = 60 * 60 * 24 * 30
+GUEST_CART_COOKIE_SECURE = not DEBUG
+GUEST_CART_COOKIE_SAMESITE = 'None' if GUEST_CART_COOKIE_SECURE else 'Lax'
+
+# Storefront feeds (products.feeds): served from the cache, rebuilt in the
+# background once older than FEED_FRESH_SECONDS.
+FEED_SIZE = 12
+FEED_FRESH_SECONDS = 300
+FEED_STALE_SECONDS = 60 * 60 * 24
+FEED_BEST_SELLER_DAYS = 30
+
+# Seconds a rendered product stays in the per-product cache (products.cache)
+PRODUCT_CACHE_TIMEOUT = 300
+
+# Finished orders older than this move to the archive tables (orders.archive)
+ORDER_ARCHIVE_AFTER_DAYS = 365
+
+# Stock holds (products.reservations) taken by POST /cart/reserve/, in seconds.
+# Expired holds are released by `python manage.py sweep_stock_holds`.
+STOCK_HOLD_TTL = 600
 
 # media files
 MEDIA_URL = '/media/'
@@ -205,5 +314,18 @@ SIMPLE_JWT = {
     "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
 
     "JTI_CLAIM": "jti",
+
+    # Blacklist checks on refresh, cached when JWT_BLACKLIST_CACHE is set (accounts.tokens)
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.TokenRefreshSerializer",
 }
 
+# Cache alias for refresh-token blacklist answers. Only a shared cache helps:
+# a refresh comes about once per access token lifetime, long after a
+# per-process entry would be useful, so without Redis the check hits the
+# database directly (one indexed query).
+JWT_BLACKLIST_CACHE = 'default' if 'REDIS_URL' in os.environ else None
+
+# Seconds a "not blacklisted" answer is cached: one refresh cycle. New
+# blacklist rows overwrite it immediately (accounts.tokens).
+JWT_BLACKLIST_CACHE_TIMEOUT = int(SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds())
+
@@ -1,5 +1,10 @@
-from django.contrib import admin
-from .models import Order, OrderItem, Cart, CartItem
+import uuid
+
+from django import forms
+from django.contrib import admin, messages
+from core.pagination import EstimatedCountPaginator
+from . import transitions
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, Cart, CartItem
 
 class OrderItemInline(admin.TabularInline):
     """
@@ -10,23 +15,118 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ('product', 'quantity', 'price_at_time', 'subtotal')
     can_delete = False # Prevent deleting items from a completed order
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'order')
+
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        old_status = self.initial.get('status')
+        if old_status is not None and status != old_status and not transitions.is_allowed(old_status, status):
+            raise forms.ValidationError(f"Can't change status from {old_status} to {status}.")
+        return status
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    form = OrderAdminForm
     list_display = ('order_number', 'user', 'status', 'total_amount', 'created_at')
     list_filter = ('status', 'created_at')
-    search_fields = ('order_number', 'user__username')
+    list_select_related = ('user',)
+    # Order numbers match exactly (see get_search_results), usernames by prefix
+    search_fields = ('^user__username',)
+    search_help_text = 'Exact order number, or the start of a username'
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ('user', 'order_number', 'total_amount', 'created_at', 'updated_at', 'shipping_address', 'billing_address', 'payment_method', 'notes')
     inlines = [OrderItemInline]
+    actions = ['advance_orders', 'cancel_orders']
 
     def has_add_permission(self, request):
         # Disable adding new orders directly from the admin interface
         return False
 
+    def get_search_results(self, request, queryset, search_term):
+        try:
+            order_number = uuid.UUID(search_term.strip())
+        except ValueError:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(order_number=order_number), False
+
+    def save_model(self, request, obj, form, change):
+        # Status changes go through the state machine (restock, rollups)
+        new_status = obj.status
+        if 'status' in form.changed_data:
+            obj.status = form.initial['status']
+        super().save_model(request, obj, form, change)
+        if new_status != obj.status:
+            transitions.change_status(Order.objects.filter(pk=obj.pk), new_status, user=request.user)
+            obj.status = new_status
+
+    @admin.action(description='Advance selected orders to their next status')
+    def advance_orders(self, request, queryset):
+        changed, rejected = transitions.advance(queryset, user=request.user)
+        self.report(request, 'advanced', changed, rejected)
+
+    @admin.action(description='Cancel selected orders and restock their items')
+    def cancel_orders(self, request, queryset):
+        changed, rejected = transitions.change_status(queryset, Order.OrderStatus.CANCELLED, user=request.user)
+        self.report(request, 'cancelled', changed, rejected)
+
+    def report(self, request, verb, changed, rejected):
+        self.message_user(request, f'{len(changed)} order(s) {verb}.')
+        if rejected:
+            self.message_user(
+                request,
+                f"{len(rejected)} order(s) skipped: can't be {verb} from status "
+                f"{', '.join(sorted({order.status for order in rejected}))}.",
+                messages.WARNING,
+            )
+
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 1
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'cart__user')
+
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ('user', 'created_at', 'updated_at')
+    list_select_related = ('user',)
     inlines = [CartItemInline]
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    readonly_fields = ('product', 'product_name', 'quantity', 'price_at_time', 'subtotal')
+    can_delete = False
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Read-only view of orders moved out by `archive_orders`."""
+    list_display = ('order_number', 'user', 'status', 'total_amount', 'created_at', 'archived_at')
+    list_filter = ('status',)
+    list_select_related = ('user',)
+    search_fields = ('^user__username',)
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    inlines = [ArchivedOrderItemInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        try:
+            order_number = uuid.UUID(search_term.strip())
+        except ValueError:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(order_number=order_number), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,52 @@
+"""
+Archive storage for old orders.
+
+Finished orders (delivered or cancelled) older than ORDER_ARCHIVE_AFTER_DAYS
+are moved from Order/OrderItem into ArchivedOrder/ArchivedOrderItem by
+`python manage.py archive_orders`, keeping their ids, so lists, admin
+changelists and analytics only scan recent orders. Each batch copies its
+orders and their items and deletes the originals in one transaction.
+
+OrderViewSet.retrieve falls back to the archive when an id or order number
+isn't in the hot table; customer stats rollups read both tables.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+FINAL_STATUSES = (Order.OrderStatus.DELIVERED, Order.OrderStatus.CANCELLED)
+
+ORDER_FIELDS = [field.attname for field in Order._meta.concrete_fields]
+ITEM_FIELDS = [field.attname for field in OrderItem._meta.concrete_fields]
+
+
+def horizon(days=None):
+    """Orders created before this are archived."""
+    return timezone.now() - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS if days is None else days)
+
+
+def archive_batch(before, batch_size=500):
+    """
+    Move up to `batch_size` finished orders created before `before`, with
+    their items, into the archive. Returns the number of orders moved.
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update(skip_locked=True)
+            .filter(created_at__lt=before, status__in=FINAL_STATUSES)
+            .order_by('pk').values(*ORDER_FIELDS)[:batch_size]
+        )
+        if not orders:
+            return 0
+        order_ids = [order['id'] for order in orders]
+        items = OrderItem.objects.filter(order_id__in=order_ids)
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+        ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**item) for item in items.values(*ITEM_FIELDS)])
+        items.delete()
+        Order.objects.filter(pk__in=order_ids).delete()
+    return len(orders)
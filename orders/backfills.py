@@ -0,0 +1,15 @@
+from django.db.models import OuterRef, Subquery
+
+from core.backfill import backfill
+from products.models import Product
+from .models import OrderItem
+
+
+@backfill(OrderItem.objects.filter(product_name=''), batch_size=2000)
+def order_item_snapshots(batch):
+    """Copy the product's name and image onto order items that have no snapshot yet."""
+    product = Product.objects.filter(pk=OuterRef('product_id'))
+    batch.update(
+        product_name=Subquery(product.values('name')[:1]),
+        product_image=Subquery(product.values('image')[:1]),
+    )
@@ -0,0 +1,118 @@
+"""
+Carts for anonymous shoppers.
+
+A guest cart is a `{product_id: quantity}` mapping kept in a signed cookie,
+so browsing and building a cart never writes to the database. When the
+guest logs in or registers, `merge_into` moves it into their Cart with a
+single bulk upsert.
+"""
+import json
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+
+from products.models import Product
+from products.serializers import ProductSerializer
+from . import pricing
+from .models import Cart, CartItem
+
+COOKIE_NAME = 'guest_cart'
+COOKIE_SALT = 'orders.guest_cart'
+
+
+class GuestCart:
+    def __init__(self, items=None):
+        self.items = dict(items or {})
+        self.modified = False
+
+    @classmethod
+    def from_request(cls, request):
+        try:
+            raw = request.get_signed_cookie(COOKIE_NAME, salt=COOKIE_SALT, max_age=settings.GUEST_CART_MAX_AGE)
+            items = {int(product_id): int(quantity) for product_id, quantity in json.loads(raw).items()}
+        except (KeyError, signing.BadSignature, ValueError, TypeError, AttributeError):
+            items = {}
+        return cls({product_id: quantity for product_id, quantity in items.items() if quantity > 0})
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def add(self, product_id, quantity):
+        if product_id not in self.items and len(self.items) >= settings.GUEST_CART_MAX_ITEMS:
+            raise ValueError(f'Guest carts are limited to {settings.GUEST_CART_MAX_ITEMS} products.')
+        self.items[product_id] = self.items.get(product_id, 0) + quantity
+        self.modified = True
+
+    def set(self, product_id, quantity):
+        self.items[product_id] = quantity
+        self.modified = True
+
+    def remove(self, product_id):
+        self.modified = self.items.pop(product_id, None) is not None or self.modified
+
+    def clear(self):
+        self.modified = self.modified or bool(self.items)
+        self.items = {}
+
+    def save(self, response):
+        """Write the cookie back onto `response` if the cart changed."""
+        if not self.modified:
+            return response
+        if not self.items:
+            response.delete_cookie(COOKIE_NAME, samesite=settings.GUEST_CART_COOKIE_SAMESITE)
+            return response
+        response.set_signed_cookie(
+            COOKIE_NAME, json.dumps(self.items, separators=(',', ':')), salt=COOKIE_SALT,
+            max_age=settings.GUEST_CART_MAX_AGE, httponly=True,
+            secure=settings.GUEST_CART_COOKIE_SECURE, samesite=settings.GUEST_CART_COOKIE_SAMESITE,
+        )
+        return response
+
+    def serialize(self, request=None):
+        """Same shape as CartSerializer; items use the product id as their id."""
+        products = Product.objects.filter(pk__in=self.items, is_active=True).select_related('category')
+        products = {product.pk: product for product in products}
+        quote = pricing.price(
+            [(products[product_id], quantity) for product_id, quantity in self.items.items() if product_id in products]
+        )
+        items = [
+            {
+                'id': line.product.pk,
+                'product': ProductSerializer(line.product, context={'request': request}).data,
+                'quantity': line.quantity,
+                'subtotal': line.total,
+                'added_at': None,
+            }
+            for line in quote.lines
+        ]
+        return {
+            'id': None, 'user': None, 'items': items, 'created_at': None, 'updated_at': None,
+            'total_price': quote.total, 'savings': quote.savings,
+        }
+
+
+def merge_into(user, guest_cart):
+    """
+    Add the guest cart's quantities to `user`'s Cart with one bulk upsert.
+    Products that no longer exist or are inactive are dropped.
+    """
+    if not guest_cart:
+        return
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user=user)
+        product_ids = set(
+            Product.objects.filter(pk__in=guest_cart.items, is_active=True).values_list('pk', flat=True)
+        )
+        existing = dict(
+            CartItem.objects.filter(cart=cart, product_id__in=product_ids).values_list('product_id', 'quantity')
+        )
+        CartItem.objects.bulk_create(
+            [
+                CartItem(cart=cart, product_id=product_id, quantity=existing.get(product_id, 0) + quantity)
+                for product_id, quantity in guest_cart.items.items() if product_id in product_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['cart', 'product'],
+            update_fields=['quantity'],
+        )
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.archive import archive_batch, horizon
+
+
+class Command(BaseCommand):
+    help = 'Move finished orders older than ORDER_ARCHIVE_AFTER_DAYS into the archive tables (see orders.archive)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive orders older than this (default: ORDER_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders moved per transaction')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        before = horizon(options['days'])
+        total = 0
+        while True:
+            moved = archive_batch(before, batch_size=options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            self.stdout.write(f'Archived {total} orders')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} orders created before {before:%Y-%m-%d}.'))
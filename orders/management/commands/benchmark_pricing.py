@@ -0,0 +1,73 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from orders import pricing
+from products.models import Category, Product
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare per-line price lookups with orders.pricing for 1, 10 and 100-line baskets (fixtures are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='*', default=[1, 10, 100], help='Basket sizes to measure')
+        parser.add_argument('--repeat', type=int, default=20, help='Best of N runs')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                products = self.create_fixtures(max(options['lines']))
+                for size in options['lines']:
+                    self.run([(product.pk, 2) for product in products[:size]], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_fixtures(self, count):
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'bench-{tag}', slug=f'bench-{tag}')
+        return Product.objects.bulk_create(
+            Product(category=category, name=f'Product {i}', slug=f'bench-{tag}-{i}', description='x',
+                    price=Decimal('19.99'), compare_price=Decimal('24.99') if i % 3 else None, sku=f'B-{tag}-{i}')
+            for i in range(count)
+        )
+
+    def run(self, lines, repeat):
+        def per_line():
+            total = Decimal('0.00')
+            for product_id, quantity in lines:
+                total += Product.objects.get(pk=product_id).price * quantity
+            return total
+
+        def batched():
+            # Without ORDER_PROMOTIONS, which the per-line baseline can't apply
+            return pricing.quote(lines, promotions=[]).total
+
+        assert per_line() == batched()
+        results = []
+        for func in (per_line, batched):
+            with CaptureQueriesContext(connection) as queries:
+                func()
+            results.append((self.best_of(repeat, func) * 1000, len(queries)))
+        (slow, slow_queries), (fast, fast_queries) = results
+        self.stdout.write(
+            f"{len(lines):>4} lines   per-line {slow:8.2f} ms ({slow_queries} queries)   "
+            f"pricing {fast:8.2f} ms ({fast_queries} queries)   ({slow / fast:.1f}x)"
+        )
+
+    @staticmethod
+    def best_of(repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
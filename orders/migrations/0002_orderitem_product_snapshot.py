@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:44
+
+from django.db import migrations, models
+
+
+# Existing items are snapshotted in batches by the orders.order_item_snapshots
+# backfill (orders/backfills.py, `manage.py run_backfill`) instead of one
+# table-wide UPDATE inside the migration.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.ImageField(blank=True, upload_to='products/'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+    ]
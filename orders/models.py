@@ -47,9 +47,17 @@ class Order(models.Model):
     billing_address = models.TextField()
     payment_method = models.CharField(max_length=20, choices=PaymentMethod.choices, default=PaymentMethod.CREDIT_CARD)
     notes = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # date ranges, recent orders
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # A user's order history, newest first
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+            # Fulfilment queues and per-status reporting
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.order_number} by {self.user.username if self.user else 'Guest'}"
 
@@ -59,10 +67,57 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField()
     price_at_time = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    # Promotion discount on the line (orders.pricing); the order's total_amount
+    # is the sum of subtotal - discount over its items
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Snapshot of the product at checkout, so order history never joins back into Product
+    product_name = models.CharField(max_length=200, blank=True)
+    product_image = models.ImageField(upload_to='products/', blank=True)
 
     def save(self, *args, **kwargs):
         self.subtotal = self.price_at_time * self.quantity
+        if self._state.adding and not self.product_name:
+            self.product_name = self.product.name
+            self.product_image = self.product.image.name
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.quantity} of {self.product.name} for Order {self.order.order_number}"
+
+# Archive of old, finished orders (see orders.archive). Rows keep the id
+# they had in Order/OrderItem.
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='archived_orders')
+    order_number = models.UUIDField(unique=True)
+    status = models.CharField(max_length=20, choices=Order.OrderStatus.choices)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    shipping_address = models.TextField()
+    billing_address = models.TextField()
+    payment_method = models.CharField(max_length=20, choices=Order.PaymentMethod.choices)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='archorder_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.order_number}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='+')
+    quantity = models.PositiveIntegerField()
+    price_at_time = models.DecimalField(max_digits=10, decimal_places=2)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    product_name = models.CharField(max_length=200, blank=True)
+    product_image = models.ImageField(upload_to='products/', blank=True)
+
+    def __str__(self):
+        return f"{self.quantity} of {self.product_name} for archived order {self.order_id}"
@@ -0,0 +1,89 @@
+"""
+Basket pricing shared by the cart and checkout.
+
+`price` takes a whole basket of `(product, quantity)` pairs and returns a
+Quote with a Line per pair: the unit price, the list price (the product's
+compare_price when it's higher, i.e. a markdown), promotion discounts and
+totals, all in exact Decimal cents. `quote` does the same for
+`(product_id, quantity)` pairs, loading every product with one query.
+
+Promotions are callables taking the basket's lines and returning
+`{line_index: discount}`; they see the whole basket, so multi-buy or
+basket-threshold offers fit. Pass them per call or list them (as dotted
+paths) in ORDER_PROMOTIONS. A line's discount never exceeds its subtotal.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from products.models import Product
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+class UnknownProducts(Exception):
+    def __init__(self, product_ids):
+        super().__init__(f"Unknown products: {', '.join(map(str, product_ids))}")
+        self.product_ids = product_ids
+
+
+class Line:
+    __slots__ = ('product', 'quantity', 'unit_price', 'list_price', 'subtotal', 'discount', 'total', 'savings')
+
+    def __init__(self, product, quantity):
+        self.product = product
+        self.quantity = quantity
+        self.unit_price = product.price
+        compare_price = product.compare_price
+        self.list_price = compare_price if compare_price is not None and compare_price > product.price else product.price
+        self.subtotal = product.price * quantity
+        self.discount = ZERO
+        self.total = self.subtotal
+        self.savings = (self.list_price - self.unit_price) * quantity
+
+    def apply_discount(self, amount):
+        amount = min(Decimal(amount).quantize(CENT, ROUND_HALF_UP), self.total)
+        if amount > 0:
+            self.discount += amount
+            self.total -= amount
+            self.savings += amount
+
+
+class Quote:
+    __slots__ = ('lines', 'subtotal', 'discount', 'total', 'savings')
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.subtotal = sum((line.subtotal for line in lines), ZERO)
+        self.discount = sum((line.discount for line in lines), ZERO)
+        self.total = sum((line.total for line in lines), ZERO)
+        self.savings = sum((line.savings for line in lines), ZERO)
+
+
+def get_promotions():
+    return [import_string(path) for path in getattr(settings, 'ORDER_PROMOTIONS', ())]
+
+
+def price(items, promotions=None):
+    """Price a basket of `(product, quantity)` pairs, keeping their order."""
+    lines = [Line(product, quantity) for product, quantity in items]
+    for promotion in get_promotions() if promotions is None else promotions:
+        for index, amount in promotion(lines).items():
+            lines[index].apply_discount(amount)
+    return Quote(lines)
+
+
+def quote(items, queryset=None, promotions=None):
+    """
+    Price a basket of `(product_id, quantity)` pairs with one product query.
+    Pass a locked or narrowed `queryset` to load the products from it.
+    Raises UnknownProducts if any id isn't found.
+    """
+    items = list(items)
+    products = (Product.objects if queryset is None else queryset).in_bulk({product_id for product_id, _ in items})
+    missing = [product_id for product_id, _ in items if product_id not in products]
+    if missing:
+        raise UnknownProducts(missing)
+    return price([(products[product_id], quantity) for product_id, quantity in items], promotions)
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Cart, CartItem, Order, OrderItem
+from django.db.models.fields.files import FieldFile
+from .models import ArchivedOrder, ArchivedOrderItem, Cart, CartItem, Order, OrderItem
 from products.serializers import ProductSerializer
+from . import pricing
 
 User = get_user_model()
 
@@ -24,22 +26,45 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'quantity', 'subtotal', 'added_at']
 
     def get_subtotal(self, obj):
-        return obj.product.price * obj.quantity
+        # Nested in CartSerializer, which prices all items in one basket
+        if self.root is not self:
+            return None
+        # On its own, price the item within its cart, as promotions see the whole basket
+        items = list(obj.cart.items.select_related('product'))
+        quote = pricing.price([(item.product, item.quantity) for item in items])
+        return next(line.total for item, line in zip(items, quote.lines) if item.pk == obj.pk)
 
 class CartSerializer(serializers.ModelSerializer):
     """
     Serializer for the Cart model.
-    Includes nested cart items and calculates the total price of the cart.
+    Includes nested cart items and prices the whole cart once with
+    orders.pricing: item subtotals, total_price and savings.
     """
     items = CartItemSerializer(many=True, read_only=True)
-    total_price = serializers.SerializerMethodField()
 
     class Meta:
         model = Cart
-        fields = ['id', 'user', 'items', 'total_price', 'created_at', 'updated_at']
+        fields = ['id', 'user', 'items', 'created_at', 'updated_at']
 
-    def get_total_price(self, obj):
-        return sum(item.product.price * item.quantity for item in obj.items.all())
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Without a prefetch the nested items come from their own, unordered query
+        items = list(instance.items.all())
+        quote = pricing.price([(item.product, item.quantity) for item in items])
+        subtotals = {item.pk: line.total for item, line in zip(items, quote.lines)}
+        for item in data['items']:
+            item['subtotal'] = subtotals.get(item['id'])
+        data['total_price'] = quote.total
+        data['savings'] = quote.savings
+        return data
+
+    @staticmethod
+    def empty(user):
+        """Representation of a cart that hasn't been created yet."""
+        return {
+            'id': None, 'user': user.pk, 'items': [], 'created_at': None, 'updated_at': None,
+            'total_price': pricing.ZERO, 'savings': pricing.ZERO,
+        }
 
 class OrderItemSerializer(serializers.ModelSerializer):
     """
@@ -50,7 +75,33 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'quantity', 'price_at_time', 'subtotal']
+        fields = ['id', 'product', 'product_name', 'product_image', 'quantity', 'price_at_time', 'subtotal', 'discount']
+
+class SnapshotImageField(serializers.ImageField):
+    """
+    Read-only image field for annotated file names (e.g. from a Subquery),
+    which arrive as plain strings instead of FieldFile instances.
+    """
+    def to_representation(self, value):
+        if isinstance(value, str):
+            value = FieldFile(None, OrderItem._meta.get_field('product_image'), value)
+        return super().to_representation(value)
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact Order representation for history lists.
+    `item_count` and `thumbnail` come from queryset annotations, see
+    OrderViewSet.get_queryset; full items are only returned on retrieve.
+    """
+    item_count = serializers.IntegerField(read_only=True)
+    thumbnail = SnapshotImageField(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'status', 'total_amount',
+            'item_count', 'thumbnail', 'created_at'
+        ]
 
 class OrderSerializer(serializers.ModelSerializer):
     """
@@ -66,4 +117,20 @@ class OrderSerializer(serializers.ModelSerializer):
             'id', 'user', 'order_number', 'status', 'total_amount', 
             'items', 'shipping_address', 'billing_address', 'payment_method', 
             'notes', 'created_at', 'updated_at'
-        ]
\ No newline at end of file
+        ]
+
+class ArchivedOrderItemSerializer(OrderItemSerializer):
+    class Meta(OrderItemSerializer.Meta):
+        model = ArchivedOrderItem
+
+class ArchivedOrderSerializer(OrderSerializer):
+    """Same representation as OrderSerializer, for orders moved to the archive."""
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+
+    class Meta(OrderSerializer.Meta):
+        model = ArchivedOrder
+
+class BulkStatusSerializer(serializers.Serializer):
+    """Input for the bulk order status endpoint."""
+    order_numbers = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=1000)
+    status = serializers.ChoiceField(choices=Order.OrderStatus.choices)
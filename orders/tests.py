@@ -1,3 +1,587 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, OuterRef, Subquery
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from analytics.models import CustomerStats
+from core.backfill import get_backfill
+from core.fast_serializers import ValuesPlan
+from products.models import Category, Product
+from . import archive, pricing, transitions
+from .models import ArchivedOrder, ArchivedOrderItem, Cart, CartItem, Order, OrderItem
+from .serializers import OrderSerializer, OrderSummarySerializer
+
+User = get_user_model()
+
+
+class OrderValuesPlanTests(TestCase):
+    """The precompiled read path must render exactly like OrderSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jane', 'jane@example.com', 'pass', first_name='Jane')
+        category = Category.objects.create(name='Creatine', slug='creatine')
+        product = Product.objects.create(
+            category=category, name='Creatine', slug='creatine', description='Monohydrate',
+            image='products/bcaa1.jpg', price=Decimal('24.99'), sku='FS-C', stock_quantity=10,
+        )
+        order = Order.objects.create(user=cls.user, total_amount=Decimal('49.98'),
+                                     shipping_address='1 Main St', billing_address='1 Main St')
+        OrderItem.objects.create(order=order, product=product, quantity=2, price_at_time=product.price)
+        # Orders survive their user being deleted, and may be empty.
+        Order.objects.create(user=None, total_amount=Decimal('0'), shipping_address='x', billing_address='y',
+                             status=Order.OrderStatus.CANCELLED, notes='guest')
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_list_parity(self):
+        request = Request(APIRequestFactory().get('/'))
+        queryset = Order.objects.order_by('-created_at')
+        for context_request in (None, request):
+            expected = OrderSerializer(queryset, many=True, context={'request': context_request}).data
+            actual = ValuesPlan(OrderSerializer).serialize(queryset, request=context_request)
+            self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_endpoints_match_serializer(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        request = Request(APIRequestFactory().get('/'))
+        queryset = Order.objects.filter(user=self.user).order_by('-created_at')
+
+        order = queryset.get()
+        response = client.get(f'/api/v1/orders/{order.pk}/')
+        self.assertEqual(response.content, self.render(OrderSerializer(order, context={'request': request}).data))
+        self.assertEqual(client.get('/api/v1/orders/abc/').status_code, 404)
+
+
+class OrderHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('sam', 'sam@example.com', 'pass')
+        category = Category.objects.create(name='Vitamins', slug='vitamins')
+        cls.product = Product.objects.create(
+            category=category, name='Vitamin D3', slug='vitamin-d3', description='D3 + K2',
+            image='products/multivita.jpg', price=Decimal('16.99'), sku='FS-D3', stock_quantity=10,
+        )
+        cls.order = Order.objects.create(user=cls.user, total_amount=Decimal('33.98'),
+                                         shipping_address='a', billing_address='b')
+        OrderItem.objects.create(order=cls.order, product=cls.product, quantity=2, price_at_time=cls.product.price)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_items_snapshot_the_product(self):
+        self.product.name = 'Renamed'
+        self.product.image = 'products/other.jpg'
+        self.product.save()
+
+        item = self.order.items.get()
+        self.assertEqual(item.product_name, 'Vitamin D3')
+        self.assertEqual(item.product_image.name, 'products/multivita.jpg')
+
+    def test_list_is_a_summary(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/orders/')
+        self.assertEqual(response.json(), [{
+            'id': self.order.pk,
+            'order_number': str(self.order.order_number),
+            'status': 'pending',
+            'total_amount': '33.98',
+            'item_count': 1,
+            'thumbnail': 'http://testserver/media/products/multivita.jpg',
+            'created_at': response.json()[0]['created_at'],
+        }])
+
+        request = Request(APIRequestFactory().get('/'))
+        queryset = Order.objects.filter(pk=self.order.pk).annotate(
+            item_count=Count('items'),
+            thumbnail=Subquery(OrderItem.objects.filter(order=OuterRef('pk')).values('product_image')[:1]),
+        )
+        expected = OrderSummarySerializer(queryset, many=True, context={'request': request}).data
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_retrieve_has_full_items(self):
+        response = self.client.get(f'/api/v1/orders/{self.order.pk}/')
+        item = response.json()['items'][0]
+        self.assertEqual(item['product_name'], 'Vitamin D3')
+        self.assertEqual(item['product']['slug'], 'vitamin-d3')
+
+
+class LazyCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lee', 'lee@example.com', 'pass')
+        category = Category.objects.create(name='Shakers', slug='shakers')
+        cls.product = Product.objects.create(
+            category=category, name='Shaker', slug='shaker', description='x',
+            image='products/shaker.jpg', price=Decimal('9.99'), sku='FS-S', stock_quantity=10,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_do_not_create_a_cart(self):
+        response = self.client.get('/api/v1/cart/')
+        self.assertEqual(response.json(), {
+            'id': None, 'user': self.user.pk, 'items': [], 'total_price': 0, 'savings': 0,
+            'created_at': None, 'updated_at': None,
+        })
+        self.assertEqual(self.client.delete('/api/v1/cart/clear/').status_code, 204)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_missing_and_empty_carts_render_alike(self):
+        missing = self.client.get('/api/v1/cart/').json()
+        Cart.objects.create(user=self.user)
+        empty = self.client.get('/api/v1/cart/').json()
+        for field in ('total_price', 'savings'):
+            self.assertEqual(repr(missing[field]), repr(empty[field]))
+
+    def test_first_write_creates_the_cart(self):
+        response = self.client.post('/api/v1/cart/add/', {'product_id': self.product.pk, 'quantity': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Cart.objects.get().user, self.user)
+        self.assertEqual(self.client.get('/api/v1/cart/').json()['total_price'], 19.98)
+
+    def test_update_item_quantity(self):
+        self.client.post('/api/v1/cart/add/', {'product_id': self.product.pk})
+        item = Cart.objects.get().items.get()
+        response = self.client.patch(f'/api/v1/cart/items/{item.pk}/', {'quantity': 3})
+        self.assertEqual(response.status_code, 200)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 3)
+
+
+class GuestCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('gus', 'gus@example.com', 'pass12345')
+        category = Category.objects.create(name='Bars', slug='bars')
+        cls.bar = Product.objects.create(
+            category=category, name='Protein Bar', slug='protein-bar', description='x',
+            image='products/casein.jpg', price=Decimal('2.50'), sku='FS-B', stock_quantity=100,
+        )
+        cls.shake = Product.objects.create(
+            category=category, name='Shake', slug='shake', description='x',
+            image='products/casein.jpg', price=Decimal('4.00'), sku='FS-SH', stock_quantity=100,
+        )
+
+    def test_guest_cart_lives_in_a_cookie(self):
+        client = APIClient()
+        response = client.post('/api/v1/cart/add/', {'product_id': self.bar.pk, 'quantity': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('guest_cart', response.cookies)
+        self.assertFalse(Cart.objects.exists())
+
+        client.patch(f'/api/v1/cart/items/{self.bar.pk}/', {'quantity': 4})
+        cart = client.get('/api/v1/cart/').json()
+        self.assertEqual([(item['id'], item['quantity']) for item in cart['items']], [(self.bar.pk, 4)])
+        self.assertEqual(cart['total_price'], 10.0)
+
+        self.assertEqual(client.delete('/api/v1/cart/clear/').status_code, 204)
+        self.assertEqual(client.get('/api/v1/cart/').json()['items'], [])
+
+    def test_tampered_cookie_is_ignored(self):
+        client = APIClient()
+        client.cookies['guest_cart'] = '{"%d": 99}' % self.bar.pk
+        self.assertEqual(client.get('/api/v1/cart/').json()['items'], [])
+
+    def test_login_merges_guest_cart(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.bar, quantity=1)
+
+        client = APIClient()
+        client.post('/api/v1/cart/add/', {'product_id': self.bar.pk, 'quantity': 2})
+        client.post('/api/v1/cart/add/', {'product_id': self.shake.pk})
+
+        response = client.post('/api/v1/token/', {'username': 'gus', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        self.assertEqual(response.cookies['guest_cart'].value, '')
+
+        quantities = dict(cart.items.values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.bar.pk: 3, self.shake.pk: 1})
+
+
+class ReserveCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('rita', 'rita@example.com', 'pass')
+        cls.other = User.objects.create_user('otto', 'otto@example.com', 'pass')
+        category = Category.objects.create(name='Gainers', slug='gainers')
+        cls.product = Product.objects.create(
+            category=category, name='Mass Gainer', slug='mass-gainer', description='x',
+            price=Decimal('39.99'), sku='FS-G', stock_quantity=2,
+        )
+        cart = Cart.objects.create(user=cls.user)
+        CartItem.objects.create(cart=cart, product=cls.product, quantity=2)
+
+    def test_reserved_cart_checks_out(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/v1/cart/reserve/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['items'], [{'product_id': self.product.pk, 'quantity': 2}])
+
+        # Someone else can't buy the held units
+        other = APIClient()
+        other.force_authenticate(self.other)
+        response = other.post('/api/v1/orders/', {
+            'items': [{'product_id': self.product.pk, 'quantity': 1}], 'total_amount': '39.99',
+            'shipping_address': 'a', 'billing_address': 'b',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = client.post('/api/v1/orders/', {
+            'items': [{'product_id': self.product.pk, 'quantity': 2}], 'total_amount': '79.98',
+            'shipping_address': 'a', 'billing_address': 'b',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock_quantity, self.product.reserved_quantity), (0, 0))
+        movement = self.product.movements.get(reason='checkout')
+        self.assertEqual((movement.quantity, movement.reference), (-2, response.json()['order_number']))
+        # Cleared with the order, not by a later job
+        self.assertFalse(CartItem.objects.filter(cart__user=self.user).exists())
+
+    def test_reserve_conflict(self):
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=1)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/v1/cart/reserve/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['unavailable'][0]['available'], 1)
+
+
+class OrderTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cory', 'cory@example.com', 'pass')
+        cls.staff = User.objects.create_user('sue', 'sue@example.com', 'pass', is_staff=True)
+        category = Category.objects.create(name='Omega', slug='omega')
+        cls.products = [
+            Product.objects.create(
+                category=category, name=f'Fish Oil {n}', slug=f'fish-oil-{n}', description='x',
+                price=Decimal('12.00'), sku=f'FS-O{n}', stock_quantity=50,
+            )
+            for n in range(2)
+        ]
+
+    def make_orders(self, count):
+        orders = []
+        for _ in range(count):
+            order = Order.objects.create(user=self.user, total_amount=Decimal('36.00'),
+                                         shipping_address='a', billing_address='b')
+            OrderItem.objects.create(order=order, product=self.products[0], quantity=1, price_at_time=Decimal('12.00'))
+            OrderItem.objects.create(order=order, product=self.products[1], quantity=2, price_at_time=Decimal('12.00'))
+            orders.append(order)
+        return orders
+
+    def stock(self):
+        return list(Product.objects.filter(pk__in=[p.pk for p in self.products]).order_by('pk')
+                    .values_list('stock_quantity', flat=True))
+
+    def test_cancel_restocks_items(self):
+        order = self.make_orders(1)[0]
+        client = APIClient()
+        client.force_authenticate(self.staff)
+
+        response = client.patch(f'/api/v1/orders/{order.pk}/', {'status': 'cancelled'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'cancelled')
+        self.assertEqual(self.stock(), [51, 52])
+        self.assertEqual(
+            sorted(self.products[1].movements.filter(reason='cancellation').values_list('quantity', 'reference')),
+            [(2, str(order.order_number))],
+        )
+
+        # Cancelled is final
+        response = client.patch(f'/api/v1/orders/{order.pk}/', {'status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(), [51, 52])
+
+    def test_bulk_changes_use_constant_queries(self):
+        def cancel(orders):
+            cache.clear()  # so both runs queue a feed refresh
+            with CaptureQueriesContext(connection) as queries:
+                changed, rejected = transitions.change_status(
+                    Order.objects.filter(pk__in=[o.pk for o in orders]), Order.OrderStatus.CANCELLED
+                )
+            self.assertEqual((len(changed), rejected), (len(orders), []))
+            return len(queries)
+
+        self.assertEqual(cancel(self.make_orders(2)), cancel(self.make_orders(6)))
+        self.assertEqual(self.stock(), [58, 66])
+
+    def test_advance_skips_final_orders(self):
+        pending, delivered = self.make_orders(2)
+        Order.objects.filter(pk=delivered.pk).update(status=Order.OrderStatus.DELIVERED)
+
+        changed, rejected = transitions.advance(Order.objects.all())
+        self.assertEqual([(order.pk, old, order.status) for order, old in changed],
+                         [(pending.pk, 'pending', 'confirmed')])
+        self.assertEqual([order.pk for order in rejected], [delivered.pk])
+
+    def test_bulk_status_endpoint(self):
+        processing, delivered, already = self.make_orders(3)
+        Order.objects.filter(pk=processing.pk).update(status=Order.OrderStatus.PROCESSING)
+        Order.objects.filter(pk=delivered.pk).update(status=Order.OrderStatus.DELIVERED)
+        Order.objects.filter(pk=already.pk).update(status=Order.OrderStatus.SHIPPED)
+        missing = '00000000-0000-0000-0000-000000000000'
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = {
+            'order_numbers': [str(o.order_number) for o in (processing, delivered, already)] + [missing],
+            'status': 'shipped',
+        }
+        self.assertEqual(client.post('/api/v1/orders/bulk-status/', payload, format='json').status_code, 403)
+
+        client.force_authenticate(self.staff)
+        response = client.post('/api/v1/orders/bulk-status/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'updated': 1, 'results': [
+            {'order_number': str(processing.order_number), 'status': 'shipped', 'result': 'updated'},
+            {'order_number': str(delivered.order_number), 'status': 'delivered', 'result': 'rejected'},
+            {'order_number': str(already.order_number), 'status': 'shipped', 'result': 'unchanged'},
+            {'order_number': missing, 'status': None, 'result': 'not_found'},
+        ]})
+        processing.refresh_from_db()
+        self.assertEqual(processing.status, 'shipped')
+
+        response = client.post('/api/v1/orders/bulk-status/', {'order_numbers': [], 'status': 'lost'}, format='json')
+        self.assertEqual(set(response.json()), {'order_numbers', 'status'})
+
+
+class OrderAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'pass')
+        category = Category.objects.create(name='Greens', slug='greens')
+        cls.product = Product.objects.create(
+            category=category, name='Greens', slug='greens', description='x',
+            price=Decimal('30.00'), sku='FS-GR', stock_quantity=50,
+        )
+
+    def make_order(self):
+        username = f'buyer{User.objects.count()}'
+        user = User.objects.create_user(username, f'{username}@example.com')
+        order = Order.objects.create(user=user, total_amount=Decimal('30.00'), shipping_address='a', billing_address='b')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price_at_time=Decimal('30.00'))
+        return order
+
+    def test_changelist_queries_do_not_grow(self):
+        self.client.force_login(self.admin)
+
+        def changelist_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get('/admin/orders/order/').status_code, 200)
+            return len(queries)
+
+        order = self.make_order()
+        baseline = changelist_queries()
+        for _ in range(4):
+            self.make_order()
+        self.assertEqual(changelist_queries(), baseline)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f'/admin/orders/order/{order.pk}/change/')
+        self.assertEqual(sum('products_product' in q['sql'] for q in queries), 1)
+
+    def test_search_by_order_number(self):
+        order, other = self.make_order(), self.make_order()
+        self.client.force_login(self.admin)
+        response = self.client.get('/admin/orders/order/', {'q': str(order.order_number)})
+        self.assertEqual(list(response.context['cl'].result_list), [order])
+        response = self.client.get('/admin/orders/order/', {'q': other.user.username})
+        self.assertEqual(list(response.context['cl'].result_list), [other])
+
+
+class OrderIndexTests(TestCase):
+    """The order access paths must be able to use their indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ivy', 'ivy@example.com', 'pass')
+
+    def assertUsesIndex(self, queryset, name):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIn(name, queryset.explain())
+
+    def test_history_uses_user_created_index(self):
+        self.assertUsesIndex(Order.objects.filter(user=self.user).order_by('-created_at'), 'order_user_created_idx')
+
+    def test_status_queue_uses_status_created_index(self):
+        queryset = Order.objects.filter(status=Order.OrderStatus.PROCESSING).order_by('created_at')
+        self.assertUsesIndex(queryset, 'order_status_created_idx')
+
+    def test_recent_orders_use_created_index(self):
+        index = next(
+            name for name, info in connection.introspection.get_constraints(connection.cursor(), Order._meta.db_table).items()
+            if info['index'] and info['columns'] == ['created_at']
+        )
+        self.assertUsesIndex(Order.objects.order_by('-created_at')[:10], index)
+
+
+def three_for_two(lines):
+    """Every third unit of a line is free."""
+    return {index: line.unit_price * (line.quantity // 3) for index, line in enumerate(lines)}
+
+
+class PricingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('pat', 'pat@example.com', 'pass')
+        category = Category.objects.create(name='Bars', slug='bars')
+        cls.bar = Product.objects.create(
+            category=category, name='Bar', slug='bar', description='x', price=Decimal('2.49'),
+            compare_price=Decimal('2.99'), sku='FS-BAR', stock_quantity=50,
+        )
+        cls.gel = Product.objects.create(
+            category=category, name='Gel', slug='gel', description='x', price=Decimal('1.10'),
+            compare_price=Decimal('1.00'), sku='FS-GEL', stock_quantity=50,
+        )
+
+    def test_quote_prices_the_basket_in_one_query(self):
+        with self.assertNumQueries(1):
+            quote = pricing.quote([(self.gel.pk, 3), (self.bar.pk, 2)])
+        self.assertEqual([line.product for line in quote.lines], [self.gel, self.bar])
+        self.assertEqual((quote.subtotal, quote.discount, quote.total), (Decimal('8.28'), 0, Decimal('8.28')))
+        # compare_price only counts when it's above the price
+        self.assertEqual([line.savings for line in quote.lines], [0, Decimal('1.00')])
+
+        with self.assertRaises(pricing.UnknownProducts) as raised:
+            pricing.quote([(self.bar.pk, 1), (0, 1)])
+        self.assertEqual(raised.exception.product_ids, [0])
+
+    def test_promotions_discount_lines(self):
+        quote = pricing.price([(self.bar, 7), (self.gel, 1)], promotions=[three_for_two, lambda lines: {1: '5.555'}])
+        self.assertEqual([line.discount for line in quote.lines], [Decimal('4.98'), Decimal('1.10')])
+        self.assertEqual((quote.discount, quote.total), (Decimal('6.08'), Decimal('12.45')))
+        self.assertEqual(quote.savings, Decimal('3.50') + quote.discount)
+
+    def test_cart_and_checkout_share_the_quote(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for product, quantity in [(self.bar, 3), (self.gel, 2)]:
+            client.post('/api/v1/cart/add/', {'product_id': product.pk, 'quantity': quantity}, format='json')
+        with self.settings(ORDER_PROMOTIONS=['orders.tests.three_for_two']):
+            cart = client.get('/api/v1/cart/').json()
+            self.assertEqual([item['subtotal'] for item in cart['items']], [4.98, 2.2])
+            self.assertEqual((cart['total_price'], cart['savings']), (7.18, 3.99))
+            # A standalone item response is priced within its cart too
+            item = client.patch(f"/api/v1/cart/items/{cart['items'][0]['id']}/", {'quantity': 3}).json()
+            self.assertEqual(item['subtotal'], 4.98)
+
+            response = client.post('/api/v1/orders/', {
+                'shipping_address': 'x', 'billing_address': 'x', 'total_amount': '0.00',
+                'items': [{'product_id': self.bar.pk, 'quantity': 3}, {'product_id': self.gel.pk, 'quantity': 2}],
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.total_amount, Decimal('7.18'))
+        items = client.get(f'/api/v1/orders/{order.pk}/').json()['items']
+        self.assertEqual([(item['subtotal'], item['discount']) for item in items], [('7.47', '2.49'), ('2.20', '0.00')])
+        self.assertEqual(sum(Decimal(item['subtotal']) - Decimal(item['discount']) for item in items), order.total_amount)
+
+
+class OrderArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('old', 'old@example.com', 'pass')
+        category = Category.objects.create(name='Oils', slug='oils')
+        cls.product = Product.objects.create(
+            category=category, name='Fish Oil', slug='fish-oil', description='x', image='products/oil.jpg',
+            price=Decimal('12.00'), sku='FS-FO', stock_quantity=50,
+        )
+
+    def make_order(self, status, days_ago, quantity=1):
+        order = Order.objects.create(
+            user=self.user, status=status, total_amount=Decimal('12.00') * quantity,
+            shipping_address='a', billing_address='b',
+        )
+        OrderItem.objects.create(order=order, product=self.product, quantity=quantity, price_at_time=Decimal('12.00'))
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def test_only_old_finished_orders_move(self):
+        old = [self.make_order('delivered', 400, n + 1) for n in range(3)]
+        stuck = self.make_order('processing', 400)
+        recent = self.make_order('delivered', 10)
+
+        self.assertEqual(archive.archive_batch(archive.horizon(365), batch_size=2), 2)
+        self.assertEqual(archive.archive_batch(archive.horizon(365), batch_size=2), 1)
+        self.assertEqual(archive.archive_batch(archive.horizon(365), batch_size=2), 0)
+
+        self.assertEqual(set(Order.objects.values_list('pk', flat=True)), {stuck.pk, recent.pk})
+        self.assertEqual(set(ArchivedOrder.objects.values_list('pk', flat=True)), {order.pk for order in old})
+        self.assertEqual(
+            sorted(ArchivedOrderItem.objects.values_list('order_id', 'quantity')),
+            [(order.pk, n + 1) for n, order in enumerate(old)],
+        )
+        self.assertFalse(OrderItem.objects.filter(order_id__in=[order.pk for order in old]).exists())
+
+    def test_retrieve_falls_back_to_the_archive(self):
+        order = self.make_order('delivered', 400, quantity=2)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        before = client.get(f'/api/v1/orders/{order.order_number}/').json()
+        call_command('archive_orders', stdout=StringIO())
+
+        self.assertFalse(Order.objects.exists())
+        for lookup in (order.order_number, order.pk):
+            response = client.get(f'/api/v1/orders/{lookup}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), before)
+        self.assertEqual(client.get('/api/v1/orders/').json(), [])
+
+        other = User.objects.create_user('nosy', 'nosy@example.com', 'pass')
+        client.force_authenticate(other)
+        self.assertEqual(client.get(f'/api/v1/orders/{order.order_number}/').status_code, 404)
+
+    def test_customer_stats_include_archived_orders(self):
+        old = self.make_order('delivered', 400, quantity=2)
+        archive.archive_batch(archive.horizon(365))
+        recent = self.make_order('pending', 1)
+        call_command('rebuild_customer_stats', stdout=StringIO())
+        stats = CustomerStats.objects.get(user=self.user)
+        self.assertEqual((stats.order_count, stats.lifetime_spend), (2, Decimal('36.00')))
+
+        transitions.change_status(Order.objects.filter(pk=recent.pk), Order.OrderStatus.CANCELLED)
+        stats.refresh_from_db()
+        self.assertEqual(stats.last_order_at, ArchivedOrder.objects.get(pk=old.pk).created_at)
+
+
+class OrderBackfillTests(TestCase):
+    def test_item_snapshots_are_filled_in(self):
+        user = User.objects.create_user('sam', 'sam@example.com', 'pass')
+        category = Category.objects.create(name='Creatine', slug='creatine')
+        product = Product.objects.create(
+            category=category, name='Creatine', slug='creatine', description='x', image='products/c.jpg',
+            price=Decimal('15.00'), sku='FS-CR', stock_quantity=50,
+        )
+        order = Order.objects.create(user=user, total_amount=Decimal('30.00'), shipping_address='a', billing_address='b')
+        for _ in range(3):
+            OrderItem.objects.create(order=order, product=product, quantity=1, price_at_time=Decimal('15.00'))
+        OrderItem.objects.update(product_name='', product_image='')
 
-# Create your tests here.
+        get_backfill('orders.order_item_snapshots').run(batch_size=2)
+        self.assertEqual(
+            set(OrderItem.objects.values_list('product_name', 'product_image')), {('Creatine', 'products/c.jpg')}
+        )
@@ -0,0 +1,101 @@
+"""
+Order status state machine.
+
+All status changes go through `change_status` / `advance`, which validate
+each move against TRANSITIONS and apply a whole batch of orders with a
+constant number of queries: one UPDATE per (from, to) status pair, one
+batched F() restock for every cancelled order's items, one ledger INSERT
+and one CustomerStats rollup.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from analytics.rollups import record_status_changes
+from products import feeds, inventory
+from .models import Order, OrderItem
+
+Status = Order.OrderStatus
+
+# Allowed moves; cancelled and delivered are final.
+TRANSITIONS = {
+    Status.PENDING: {Status.CONFIRMED, Status.CANCELLED},
+    Status.CONFIRMED: {Status.PROCESSING, Status.CANCELLED},
+    Status.PROCESSING: {Status.SHIPPED, Status.CANCELLED},
+    Status.SHIPPED: {Status.DELIVERING, Status.DELIVERED},
+    Status.DELIVERING: {Status.DELIVERED},
+    Status.DELIVERED: set(),
+    Status.CANCELLED: set(),
+}
+
+# The usual next step, used by `advance`
+NEXT_STATUS = {
+    Status.PENDING: Status.CONFIRMED,
+    Status.CONFIRMED: Status.PROCESSING,
+    Status.PROCESSING: Status.SHIPPED,
+    Status.SHIPPED: Status.DELIVERING,
+    Status.DELIVERING: Status.DELIVERED,
+}
+
+
+def is_allowed(old_status, new_status):
+    return new_status in TRANSITIONS.get(old_status, ())
+
+
+def change_status(orders, status, user=None):
+    """Move every order in the `orders` queryset to `status`. See `apply`."""
+    return apply(orders, lambda order: status, user)
+
+
+def advance(orders, user=None):
+    """Move every order in the `orders` queryset one step along NEXT_STATUS. See `apply`."""
+    return apply(orders, lambda order: NEXT_STATUS.get(order.status), user)
+
+
+def apply(orders, target, user=None):
+    """
+    Lock the `orders` queryset and move each order to `target(order)`.
+
+    Returns `(changed, rejected)`: `changed` is a list of
+    `(order, old_status)` with `order.status` already updated, `rejected`
+    the orders whose move isn't allowed. Orders already in their target
+    status are in neither list. Valid moves are applied even when some are
+    rejected; callers wanting all-or-nothing should raise inside their own
+    transaction.
+    """
+    with transaction.atomic():
+        locked = orders.select_for_update().order_by('pk').only('pk', 'order_number', 'user', 'status', 'total_amount')
+        changed, rejected = [], []
+        groups = defaultdict(list)
+        for order in locked:
+            new_status = target(order)
+            if new_status == order.status:
+                continue
+            if not is_allowed(order.status, new_status):
+                rejected.append(order)
+                continue
+            groups[order.status, new_status].append(order.pk)
+            changed.append((order, order.status))
+            order.status = new_status
+
+        now = timezone.now()
+        for (_, new_status), pks in groups.items():
+            Order.objects.filter(pk__in=pks).update(status=new_status, updated_at=now)
+
+        cancelled = {order.pk: order.order_number for order, _ in changed if order.status == Status.CANCELLED}
+        if cancelled:
+            lines = OrderItem.objects.filter(order_id__in=cancelled) \
+                .values('order_id', 'product_id', 'product__category_id') \
+                .annotate(total=Sum('quantity')).values_list('order_id', 'product_id', 'product__category_id', 'total')
+            inventory.restock(
+                [(product_id, quantity, cancelled[order_id]) for order_id, product_id, _, quantity in lines],
+                user=user,
+            )
+            feeds.categories_sold({category_id for _, _, category_id, _ in lines})
+
+        record_status_changes(
+            [(order.user_id, order.total_amount, old_status, order.status) for order, old_status in changed]
+        )
+    return changed, rejected
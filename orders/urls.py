@@ -5,6 +5,7 @@ from .views import (
     CartItemView,
     CartItemDetailView,
     ClearCartView,
+    ReserveCartView,
     OrderViewSet
 )
 
@@ -16,5 +17,6 @@ urlpatterns = [
     path('cart/add/', CartItemView.as_view(), name='cart-add-item'),
     path('cart/items/<int:pk>/', CartItemDetailView.as_view(), name='cart-item-detail'),
     path('cart/clear/', ClearCartView.as_view(), name='cart-clear'),
+    path('cart/reserve/', ReserveCartView.as_view(), name='cart-reserve'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
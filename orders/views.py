@@ -1,25 +1,48 @@
+import uuid
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.http import Http404
 from rest_framework import viewsets, status, generics, permissions
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.exceptions import ValidationError, NotFound
-from decimal import Decimal
 
-from .models import Cart, CartItem, Order, OrderItem, Product
-from .serializers import CartSerializer, OrderSerializer, CartItemSerializer
+from analytics import rollups
+from core.fast_serializers import ValuesPlan
+from core.views import FastReadMixin
+from products import feeds, inventory, reservations
+from .models import ArchivedOrder, Cart, CartItem, Order, OrderItem, Product
+from .serializers import (
+    ArchivedOrderSerializer, BulkStatusSerializer, CartSerializer, OrderSerializer, OrderSummarySerializer,
+    CartItemSerializer,
+)
+from .guest_cart import GuestCart
+from . import pricing, transitions
 
 
 class CartView(APIView):
     """
     Manages the user's shopping cart.
     - GET: Retrieve the current user's cart.
+
+    Carts are created lazily by the first write (CartItemView); users
+    without one get an empty cart without a database insert.
+    Anonymous shoppers get a guest cart, see orders.guest_cart.
     """
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
 
     def get(self, request):
         """Retrieve the user's cart."""
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        if not request.user.is_authenticated:
+            return Response(GuestCart.from_request(request).serialize(request))
+
+        cart = Cart.objects.filter(user=request.user).prefetch_related('items__product__category').first()
+        if cart is None:
+            return Response(CartSerializer.empty(request.user))
         serializer = CartSerializer(cart)
         return Response(serializer.data)
 
@@ -29,11 +52,10 @@ class CartItemView(APIView):
     Manages items within a shopping cart.
     - POST: Add an item to the cart.
     """
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
 
     def post(self, request):
         """Add a product to the cart or update its quantity."""
-        cart, _ = Cart.objects.get_or_create(user=request.user)
         product_id = request.data.get('product_id')
         quantity = int(request.data.get('quantity', 1))
 
@@ -48,6 +70,16 @@ class CartItemView(APIView):
         if quantity <= 0:
             raise ValidationError({'quantity': 'Quantity must be a positive integer.'})
 
+        if not request.user.is_authenticated:
+            guest_cart = GuestCart.from_request(request)
+            try:
+                guest_cart.add(product.id, quantity)
+            except ValueError as exc:
+                raise ValidationError({'product_id': str(exc)})
+            return guest_cart.save(Response(guest_cart.serialize(request), status=status.HTTP_200_OK))
+
+        # First write materializes the cart
+        cart, _ = Cart.objects.get_or_create(user=request.user)
         cart_item, created = CartItem.objects.get_or_create(
             cart=cart,
             product=product,
@@ -67,8 +99,10 @@ class CartItemDetailView(generics.UpdateAPIView, generics.DestroyAPIView):
     Manages a specific item in the cart.
     - PUT/PATCH: Update an item's quantity.
     - DELETE: Remove an item from the cart.
+
+    Guest cart items are addressed by product id.
     """
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
     serializer_class = CartItemSerializer
     queryset = CartItem.objects.all()
 
@@ -81,37 +115,119 @@ class CartItemDetailView(generics.UpdateAPIView, generics.DestroyAPIView):
         if quantity <= 0:
             # If quantity is zero or less, remove the item
             return self.destroy(request, *args, **kwargs)
+        if not request.user.is_authenticated:
+            guest_cart = self.get_guest_cart()
+            guest_cart.set(self.kwargs['pk'], quantity)
+            return guest_cart.save(Response(guest_cart.serialize(request)))
         return super().update(request, *args, **kwargs)
 
+    def destroy(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            guest_cart = self.get_guest_cart()
+            guest_cart.remove(self.kwargs['pk'])
+            return guest_cart.save(Response(status=status.HTTP_204_NO_CONTENT))
+        return super().destroy(request, *args, **kwargs)
+
+    def get_guest_cart(self):
+        guest_cart = GuestCart.from_request(self.request)
+        if self.kwargs['pk'] not in guest_cart.items:
+            raise NotFound('Item not found in cart.')
+        return guest_cart
+
 
 class ClearCartView(APIView):
     """
     Clears all items from the user's shopping cart.
     """
+    permission_classes = [AllowAny]
+
+    def delete(self, request):
+        if not request.user.is_authenticated:
+            guest_cart = GuestCart.from_request(request)
+            guest_cart.clear()
+            return guest_cart.save(Response(status=status.HTTP_204_NO_CONTENT))
+
+        CartItem.objects.filter(cart__user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ReserveCartView(APIView):
+    """
+    Holds stock for the items in the user's cart while they check out.
+    - POST: Reserve every cart line for STOCK_HOLD_TTL seconds, replacing earlier holds.
+    - DELETE: Release the user's holds.
+
+    Holds are converted into stock decrements when the order is placed.
+    """
     permission_classes = [IsAuthenticated]
 
+    def post(self, request):
+        quantities = dict(
+            CartItem.objects.filter(cart__user=request.user).values_list('product_id', 'quantity')
+        )
+        if not quantities:
+            raise ValidationError('Your cart is empty.')
+
+        try:
+            holds = reservations.reserve(request.user, quantities)
+        except reservations.InsufficientStock as exc:
+            return Response({
+                'detail': 'Not enough stock to reserve your cart.',
+                'unavailable': [
+                    {'product_id': product.id, 'name': product.name, 'available': product.available_quantity}
+                    for product in exc.products
+                ],
+            }, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'expires_at': holds[0].expires_at,
+            'items': [{'product_id': hold.product_id, 'quantity': hold.quantity} for hold in holds],
+        }, status=status.HTTP_201_CREATED)
+
     def delete(self, request):
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        cart.items.all().delete()
+        reservations.release(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(FastReadMixin, viewsets.ModelViewSet):
     """
     Handles creating and viewing orders.
     - Admin users can see all orders
     - Regular users can only see their own orders
     """
     serializer_class = OrderSerializer
+    # Reads are rendered straight from .values() rows, see core.fast_serializers
+    fast_read_plan = ValuesPlan(OrderSerializer)
+    summary_read_plan = ValuesPlan(OrderSummarySerializer)
+    archived_read_plan = ValuesPlan(ArchivedOrderSerializer)
 
     def get_queryset(self):
         """Return appropriate queryset based on user permissions."""
         if self.request.user.is_staff:
             # Admin can see all orders
-            return Order.objects.all().select_related('user').prefetch_related('items__product').order_by('-created_at')
+            queryset = Order.objects.all()
         else:
             # Regular users see only their orders
-            return Order.objects.filter(user=self.request.user).select_related('user').prefetch_related('items__product').order_by('-created_at')
+            queryset = Order.objects.filter(user=self.request.user)
+
+        if self.action == 'list':
+            # History list: counts and the first item's snapshot, no item rows
+            first_item = OrderItem.objects.filter(order=OuterRef('pk')).order_by('pk')
+            return queryset.annotate(
+                item_count=Count('items'),
+                thumbnail=Subquery(first_item.values('product_image')[:1]),
+            ).order_by('-created_at')
+        return queryset.select_related('user').prefetch_related('items__product').order_by('-created_at')
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderSummarySerializer
+        return OrderSerializer
+
+    def get_fast_read_plan(self):
+        if self.action == 'list':
+            return self.summary_read_plan
+        return self.fast_read_plan
 
     def get_permissions(self):
         """Set permissions based on action."""
@@ -121,8 +237,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         elif self.action == 'create':
             # Anyone authenticated can create orders
             permission_classes = [IsAuthenticated]
-        elif self.action == 'destroy':
-            # Only admin can delete orders
+        elif self.action in ['destroy', 'bulk_status']:
+            # Only admin can delete orders or change them in bulk
             permission_classes = [IsAdminUser]
         else:
             permission_classes = [IsAuthenticated]
@@ -147,48 +263,73 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         # Use a transaction to ensure atomicity
         with transaction.atomic():
-            # Check for sufficient stock before creating the order
-            total_amount = Decimal('0.00')
-            
-            for item_data in submitted_items:
-                try:
-                    product = Product.objects.get(id=item_data['product_id'])
-                except Product.DoesNotExist:
-                    raise ValidationError(f"Product with ID {item_data['product_id']} not found.")
-                
-                quantity = int(item_data['quantity'])
-                
-                if product.stock_quantity < quantity:
-                    raise ValidationError(f"Not enough stock for {product.name}. Available: {product.stock_quantity}")
-                
-                total_amount += product.price * quantity
+            lines = [(int(item_data['product_id']), int(item_data['quantity'])) for item_data in submitted_items]
+            try:
+                quote = pricing.quote(lines)
+            except pricing.UnknownProducts as exc:
+                raise ValidationError(f"Product with ID {exc.product_ids[0]} not found.")
+            products = {line.product.pk: line.product for line in quote.lines}
+            quantities = {}
+            for product_id, quantity in lines:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+            # Decrease stock with conditional updates, consuming the user's
+            # holds from /cart/reserve/ (see products.reservations)
+            try:
+                reservations.commit(self.request.user, quantities)
+            except reservations.InsufficientStock as exc:
+                product = exc.products[0]
+                raise ValidationError(f"Not enough stock for {product.name}. Available: {product.available_quantity}")
 
             # Create the order
             order = serializer.save(
                 user=self.request.user,
-                total_amount=total_amount
+                total_amount=quote.total
             )
 
-            # Create order items and decrease product stock
-            for item_data in submitted_items:
-                product = Product.objects.get(id=item_data['product_id'])
-                quantity = int(item_data['quantity'])
-                
+            for line in quote.lines:
                 OrderItem.objects.create(
                     order=order,
-                    product=product,
-                    quantity=quantity,
-                    price_at_time=product.price
+                    product=line.product,
+                    quantity=line.quantity,
+                    price_at_time=line.unit_price,
+                    discount=line.discount,
                 )
-                
-                # Decrease stock
-                product.stock_quantity -= quantity
-                product.save()
+            inventory.record(
+                {product_id: -quantity for product_id, quantity in quantities.items()},
+                inventory.Reason.CHECKOUT, order.order_number, self.request.user,
+            )
+            feeds.categories_sold({product.category_id for product in products.values()})
 
-            # Clear the user's server-side cart if it exists
-            cart = Cart.objects.filter(user=self.request.user).first()
-            if cart:
-                cart.items.all().delete()
+            # Clear the user's server-side cart with the order, so items added
+            # after checkout survive and the cart never shows bought items
+            CartItem.objects.filter(cart__user=self.request.user).delete()
+
+            # Count the order in the same transaction, so a cancellation always
+            # finds its placement already counted
+            rollups.record_order_placed(order)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Look an order up by id or order number. Orders moved out of the hot
+        tables (see orders.archive) are found in the archive; they are read-only.
+        """
+        try:
+            lookup = {'order_number': uuid.UUID(kwargs['pk'])}
+        except ValueError:
+            lookup = {'pk': kwargs['pk']}
+
+        archived = ArchivedOrder.objects.all()
+        if not request.user.is_staff:
+            archived = archived.filter(user=request.user)
+        try:
+            rows = self.fast_read_plan.serialize(self.get_queryset().filter(**lookup), request=request) or \
+                self.archived_read_plan.serialize(archived.filter(**lookup), request=request)
+        except (TypeError, ValueError, DjangoValidationError):
+            rows = None
+        if not rows:
+            raise Http404('No Order matches the given query.')
+        return Response(rows[0])
 
     def update(self, request, *args, **kwargs):
         """Allow admin to update order status, users to update limited fields."""
@@ -199,4 +340,47 @@ class OrderViewSet(viewsets.ModelViewSet):
                 if field not in allowed_fields:
                     raise ValidationError(f"You don't have permission to update {field}")
         
-        return super().update(request, *args, **kwargs)
\ No newline at end of file
+        return super().update(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """
+        Move many orders to one status: {"order_numbers": [...], "status": "shipped"}.
+        Returns one compact result per order number instead of the full orders.
+        """
+        serializer = BulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_numbers = list(dict.fromkeys(serializer.validated_data['order_numbers']))
+        new_status = serializer.validated_data['status']
+
+        changed, rejected = transitions.change_status(
+            Order.objects.filter(order_number__in=order_numbers), new_status, user=request.user
+        )
+        results = {order.order_number: (order.status, 'updated') for order, _ in changed}
+        results.update((order.order_number, (order.status, 'rejected')) for order in rejected)
+        rest = [number for number in order_numbers if number not in results]
+        if rest:
+            # Orders already in the target status
+            unchanged = Order.objects.filter(order_number__in=rest).values_list('order_number', 'status')
+            results.update((number, (current, 'unchanged')) for number, current in unchanged)
+
+        rows = []
+        for number in order_numbers:
+            current, result = results.get(number, (None, 'not_found'))
+            rows.append({'order_number': number, 'status': current, 'result': result})
+        return Response({'updated': len(changed), 'results': rows})
+
+    def perform_update(self, serializer):
+        # Status changes go through the state machine (restock, rollups)
+        order = serializer.instance
+        old_status = order.status
+        new_status = serializer.validated_data.pop('status', old_status)
+        with transaction.atomic():
+            serializer.save()
+            if new_status != old_status:
+                _, rejected = transitions.change_status(
+                    Order.objects.filter(pk=order.pk), new_status, user=self.request.user
+                )
+                if rejected:
+                    raise ValidationError({'status': f"Can't change status from {old_status} to {new_status}."})
+                order.status = new_status
\ No newline at end of file
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Category, Product
+from django.db.models import F
+from core.pagination import EstimatedCountPaginator
+from . import cache as product_cache, feeds, inventory
+from .models import Category, Product, StockMovement
 
 # Register your models here.
 @admin.register(Category)
@@ -9,7 +12,51 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'category', 'price', 'stock_quantity', 'is_active')
+    list_display = ('name', 'category', 'price', 'stock_quantity', 'reserved_quantity', 'is_active')
+    readonly_fields = ('reserved_quantity',)  # maintained by products.reservations
     list_filter = ('category', 'is_active', 'is_featured')
+    list_select_related = ('category',)
     search_fields = ('name', 'sku')
-    prepopulated_fields = {'slug': ('name',)}
\ No newline at end of file
+    prepopulated_fields = {'slug': ('name',)}
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        # Stock edits are applied as a delta and logged in the ledger
+        delta = 0
+        if change and 'stock_quantity' in form.changed_data:
+            delta = obj.stock_quantity - form.initial['stock_quantity']
+            obj.stock_quantity = F('stock_quantity')
+        super().save_model(request, obj, form, change)
+        inventory.adjust(obj, delta, user=request.user)
+        product_cache.invalidate([obj.pk])
+        feeds.product_changed(obj)
+
+    def delete_model(self, request, obj):
+        product_cache.invalidate([obj.pk])
+        feeds.product_changed(obj)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        product_cache.invalidate(list(queryset.values_list('pk', flat=True)))
+        feeds.schedule_refresh([feeds.FEATURED, feeds.NEW_ARRIVALS] + [
+            feeds.best_sellers(category_id) for category_id in queryset.values_list('category_id', flat=True).distinct()
+        ])
+        super().delete_queryset(request, queryset)
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('product', 'quantity', 'reason', 'reference', 'user', 'created_at')
+    list_filter = ('reason',)
+    list_select_related = ('product', 'user')
+    search_fields = ('product__sku', 'reference')
+    raw_id_fields = ('product', 'user')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # Append-only: movements are written by checkout and stock adjustments
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
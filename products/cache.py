@@ -0,0 +1,71 @@
+"""
+Per-product cache of rendered ProductSerializer rows.
+
+A row is stored under `product:<pk>` with relative image URLs; slugs and
+SKUs point at the pk under `product-slug:<slug>` and `product-sku:<sku>`.
+Aliases are never invalidated: a row reached through one is only used if
+it still carries that slug or SKU. Rows are dropped by `invalidate` when a
+product is edited or its stock moves (every stock change is written to the
+ledger, see `inventory.record` and `inventory.restock`), and expire after
+PRODUCT_CACHE_TIMEOUT so category edits eventually show up. Invalidation
+only reaches every worker because the cache is shared (see CACHES).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.fast_serializers import ValuesPlan
+from .models import Product
+from .serializers import ProductSerializer
+
+LOOKUP_FIELDS = ('id', 'slug', 'sku')
+
+product_plan = ValuesPlan(ProductSerializer)
+
+
+def row_key(pk):
+    return f'product:{pk}'
+
+
+def alias_key(field, value):
+    return f'product-{field}:{value}'
+
+
+def get_many(field, keys):
+    """
+    Return `{key: row}` for the products whose `field` ('id', 'slug' or
+    'sku') is in `keys`. Cached rows are used where possible; the rest are
+    loaded with one query and cached. Missing keys are left out.
+    """
+    keys = list(dict.fromkeys(keys))
+    if field == 'id':
+        pks = {key: key for key in keys}
+    else:
+        aliases = cache.get_many([alias_key(field, key) for key in keys])
+        pks = {key: aliases[alias_key(field, key)] for key in keys if alias_key(field, key) in aliases}
+    cached = cache.get_many([row_key(pk) for pk in pks.values()])
+
+    found = {}
+    for key, pk in pks.items():
+        row = cached.get(row_key(pk))
+        if row is not None and row[field] == key:
+            found[key] = row
+
+    missing = [key for key in keys if key not in found]
+    if missing:
+        rows = product_plan.serialize(Product.objects.filter(**{f'{field}__in': missing}))
+        entries = {}
+        for row in rows:
+            found[row[field]] = row
+            entries[row_key(row['id'])] = row
+            entries[alias_key('slug', row['slug'])] = row['id']
+            entries[alias_key('sku', row['sku'])] = row['id']
+        cache.set_many(entries, settings.PRODUCT_CACHE_TIMEOUT)
+    return found
+
+
+def invalidate(product_ids):
+    """Drop the cached rows of `product_ids` once the current transaction commits."""
+    keys = [row_key(pk) for pk in product_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,125 @@
+"""
+Precomputed storefront feeds: featured products, new arrivals and
+best-sellers per category.
+
+Each feed is a short list of compact product cards stored in the cache
+together with the time it stops being fresh. Reads never wait on a
+rebuild once a feed exists (stale-while-revalidate): a stale feed is
+served as is and a refresh job is queued, at most once per
+FEED_REFRESH_LOCK seconds. Catalog changes and checkouts queue refreshes
+for just the feeds they can affect, see `product_changed` and
+`categories_sold`.
+
+Settings: FEED_SIZE, FEED_FRESH_SECONDS, FEED_STALE_SECONDS,
+FEED_BEST_SELLER_DAYS.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.http import Http404
+from django.utils import timezone
+
+from core.fast_serializers import ValuesPlan
+from .models import Category, Product
+from .serializers import ProductCardSerializer
+
+FEATURED = 'featured'
+NEW_ARRIVALS = 'new-arrivals'
+BEST_SELLERS = 'best-sellers'
+FEED_REFRESH_LOCK = 60
+
+card_plan = ValuesPlan(ProductCardSerializer)
+
+
+def best_sellers(category_id):
+    return f'{BEST_SELLERS}:{category_id}'
+
+
+def _cards(queryset):
+    return card_plan.serialize(queryset[:settings.FEED_SIZE])
+
+
+def build(name):
+    """Compute a feed from the database."""
+    active = Product.objects.filter(is_active=True)
+    if name == FEATURED:
+        return _cards(active.filter(is_featured=True).order_by('-updated_at'))
+    if name == NEW_ARRIVALS:
+        return _cards(active.order_by('-created_at'))
+
+    kind, _, category_id = name.partition(':')
+    if kind != BEST_SELLERS or not category_id.isdigit():
+        raise Http404(f'No feed named {name!r}.')
+    if not Category.objects.filter(pk=category_id, is_active=True).exists():
+        raise Http404('Category not found.')
+
+    from orders.models import OrderItem
+
+    since = timezone.now() - timedelta(days=settings.FEED_BEST_SELLER_DAYS)
+    ranking = list(
+        OrderItem.objects.filter(product__category_id=category_id, product__is_active=True, order__created_at__gte=since)
+        .exclude(order__status='cancelled')
+        .values('product_id').annotate(sold=Sum('quantity')).order_by('-sold', 'product_id')
+        .values_list('product_id', flat=True)[:settings.FEED_SIZE]
+    )
+    cards = {card['id']: card for card in card_plan.serialize(Product.objects.filter(pk__in=ranking))}
+    return [cards[product_id] for product_id in ranking if product_id in cards]
+
+
+def names():
+    """Every feed that can be served: the catalog-wide ones and best-sellers per active category."""
+    category_ids = Category.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+    return [FEATURED, NEW_ARRIVALS] + [best_sellers(category_id) for category_id in category_ids]
+
+
+def refresh(name):
+    """Rebuild a feed and store it. Returns the items."""
+    cache.delete(f'feed-queued:{name}')
+    items = build(name)
+    cache.set(f'feed:{name}', {'items': items, 'fresh_until': time.time() + settings.FEED_FRESH_SECONDS},
+              settings.FEED_STALE_SECONDS)
+    return items
+
+
+def discard(name):
+    cache.delete(f'feed:{name}')
+
+
+def get(name):
+    """Return a feed, building it only if it isn't cached at all."""
+    entry = cache.get(f'feed:{name}')
+    if entry is None:
+        return refresh(name)
+    if entry['fresh_until'] < time.time():
+        schedule_refresh([name])
+    return entry['items']
+
+
+def schedule_refresh(names):
+    """
+    Queue a background rebuild of `names`, skipping feeds already queued.
+    Both happen once the current transaction commits, so a rolled back
+    change neither queues a job nor leaves the feeds marked as queued.
+    """
+    from . import tasks
+
+    def enqueue():
+        queued = [name for name in names if cache.add(f'feed-queued:{name}', True, FEED_REFRESH_LOCK)]
+        if queued:
+            tasks.refresh_feeds.enqueue(queued)
+
+    names = list(dict.fromkeys(names))
+    if names:
+        transaction.on_commit(enqueue)
+
+
+def product_changed(product):
+    schedule_refresh([FEATURED, NEW_ARRIVALS, best_sellers(product.category_id)])
+
+
+def categories_sold(category_ids):
+    schedule_refresh([best_sellers(category_id) for category_id in category_ids])
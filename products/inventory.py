@@ -0,0 +1,127 @@
+"""
+Stock ledger: every change to Product.stock_quantity is also appended to
+StockMovement, in bulk where a request touches several products.
+
+Product.stock_quantity remains the counter that checkout and reservations
+update atomically; the ledger exists to reconcile it. Movements older than
+a retention window are folded into one StockSnapshot row per product by
+`compact`, so ledger stock is always `snapshot + remaining movements` and
+reading it touches a handful of rows per product.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from . import cache as product_cache
+from .models import LOW_STOCK, Product, StockMovement, StockSnapshot
+
+Reason = StockMovement.Reason
+
+
+def record(changes, reason, reference='', user=None):
+    """Append `{product_id: signed_quantity}` to the ledger in one INSERT."""
+    movements = StockMovement.objects.bulk_create([
+        StockMovement(product_id=product_id, quantity=quantity, reason=reason,
+                      reference=str(reference), user=user)
+        for product_id, quantity in changes.items() if quantity
+    ])
+    # Cached product rows carry stock_quantity
+    product_cache.invalidate([movement.product_id for movement in movements])
+
+
+def adjust(product, delta, user=None, reference=''):
+    """
+    Move `product`'s stock by `delta` with an F() update (so a concurrent
+    checkout isn't overwritten) and log it as an adjustment.
+    """
+    if not delta:
+        return
+    Product.objects.filter(pk=product.pk).update(stock_quantity=F('stock_quantity') + delta)
+    product.refresh_from_db(fields=['stock_quantity'])
+    record({product.pk: delta}, Reason.ADJUSTMENT, reference, user)
+
+
+def restock(lines, reason=Reason.CANCELLATION, user=None):
+    """
+    Put `(product_id, quantity, reference)` lines back into stock with one
+    UPDATE across all products and one ledger INSERT.
+    """
+    totals = defaultdict(int)
+    for product_id, quantity, _ in lines:
+        totals[product_id] += quantity
+    if not totals:
+        return
+    Product.objects.filter(pk__in=totals).update(
+        stock_quantity=F('stock_quantity') + Case(
+            *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in totals.items()],
+            default=Value(0), output_field=IntegerField(),
+        )
+    )
+    movements = StockMovement.objects.bulk_create([
+        StockMovement(product_id=product_id, quantity=quantity, reason=reason, reference=str(reference), user=user)
+        for product_id, quantity, reference in lines if quantity
+    ])
+    product_cache.invalidate({movement.product_id for movement in movements})
+
+
+def low_stock():
+    """Active products at or below their low_stock_threshold, lowest stock first (served by product_low_stock_idx)."""
+    return Product.objects.filter(LOW_STOCK).order_by('stock_quantity', 'pk')
+
+
+def ledger_stock(product_ids):
+    """`{product_id: quantity}` according to the ledger (snapshot + movements since)."""
+    stock = dict.fromkeys(product_ids, 0)
+    stock.update(StockSnapshot.objects.filter(product_id__in=product_ids).values_list('product_id', 'quantity'))
+    deltas = StockMovement.objects.filter(product_id__in=product_ids) \
+        .values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+    for product_id, total in deltas:
+        stock[product_id] += total
+    return stock
+
+
+def drift(batch_size=1000):
+    """Yield `(product_id, stock_quantity, ledger_quantity)` wherever the two disagree."""
+    last_pk = 0
+    while True:
+        batch = dict(
+            Product.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'stock_quantity')[:batch_size]
+        )
+        if not batch:
+            return
+        for product_id, ledger_quantity in ledger_stock(list(batch)).items():
+            if ledger_quantity != batch[product_id]:
+                yield product_id, batch[product_id], ledger_quantity
+        last_pk = max(batch)
+
+
+def compact(before, batch_size=500):
+    """
+    Fold movements created before `before` into StockSnapshot and delete
+    them, `batch_size` products per transaction. Returns the number of
+    movements folded.
+    """
+    folded = 0
+    last_product = 0
+    while True:
+        with transaction.atomic():
+            old = StockMovement.objects.filter(created_at__lt=before)
+            totals = dict(
+                old.filter(product_id__gt=last_product).values('product_id').order_by('product_id')
+                .annotate(total=Sum('quantity')).values_list('product_id', 'total')[:batch_size]
+            )
+            if not totals:
+                return folded
+
+            snapshots = StockSnapshot.objects.select_for_update().in_bulk(list(totals))
+            StockSnapshot.objects.bulk_create(
+                [StockSnapshot(product_id=product_id,
+                               quantity=(snapshots[product_id].quantity if product_id in snapshots else 0) + total,
+                               taken_at=before)
+                 for product_id, total in totals.items()],
+                update_conflicts=True, unique_fields=['product'], update_fields=['quantity', 'taken_at'],
+            )
+            deleted, _ = old.filter(product_id__in=list(totals)).delete()
+            folded += deleted
+            last_product = max(totals)
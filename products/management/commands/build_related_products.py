@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from products import related
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "frequently bought together" relations from order co-occurrence (see products.related)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=10, help='Related products kept per product')
+        parser.add_argument('--days', type=int, help='Only count orders from the last N days (default: all)')
+        parser.add_argument('--max-basket', type=int, default=50, help='Skip orders with more distinct products')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Order items fetched per round trip')
+
+    def handle(self, *args, **options):
+        order_items = OrderItem.objects.exclude(order__status=Order.OrderStatus.CANCELLED)
+        if options['days']:
+            order_items = order_items.filter(order__created_at__gte=timezone.now() - timedelta(days=options['days']))
+
+        start = time.perf_counter()
+        table = related.build(order_items, top_k=options['top_k'], max_basket=options['max_basket'],
+                              chunk_size=options['chunk_size'])
+        written = related.store(table)
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} relations for {len(table)} products in {time.perf_counter() - start:.1f}s.'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.inventory import low_stock
+
+
+class Command(BaseCommand):
+    help = 'List active products at or below their low_stock_threshold (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail', action='store_true', help='Exit with an error status if any product is low')
+
+    def handle(self, *args, **options):
+        products = list(low_stock().values_list('sku', 'name', 'stock_quantity', 'reserved_quantity', 'low_stock_threshold'))
+        for sku, name, stock, reserved, threshold in products:
+            self.stdout.write(f'{sku:<20} {name[:40]:<40} stock {stock:>6}  reserved {reserved:>6}  threshold {threshold:>6}')
+        if products and options['fail']:
+            raise CommandError(f'{len(products)} product(s) low on stock.')
+        self.stdout.write(f'{len(products)} product(s) low on stock.')
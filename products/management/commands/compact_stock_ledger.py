@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products import inventory
+
+
+class Command(BaseCommand):
+    help = 'Fold old stock movements into per-product snapshots (see products.inventory)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=30, help='Leave movements newer than this in the ledger')
+        parser.add_argument('--batch-size', type=int, default=500, help='Products folded per transaction')
+        parser.add_argument('--check', action='store_true',
+                            help='Also report products whose stock_quantity disagrees with the ledger')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['keep_days'])
+        folded = inventory.compact(before, batch_size=options['batch_size'])
+        self.stdout.write(f'Folded {folded} movements older than {before:%Y-%m-%d %H:%M}')
+
+        if options['check']:
+            mismatches = 0
+            for product_id, stock_quantity, ledger_quantity in inventory.drift():
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(
+                    f'Product {product_id}: stock_quantity={stock_quantity} ledger={ledger_quantity}'
+                ))
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS('Stock matches the ledger'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.reservations import sweep_expired
+
+
+class Command(BaseCommand):
+    help = 'Release expired stock holds (see products.reservations)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Holds released per transaction')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep sweeping every N seconds instead of exiting')
+
+    def handle(self, *args, **options):
+        while True:
+            released = sweep_expired(batch_size=options['batch_size'])
+            self.stdout.write(f'Released {released} expired holds')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def open_ledger(apps, schema_editor):
+    """Start every existing product's ledger from its current stock."""
+    Product = apps.get_model('products', 'Product')
+    StockSnapshot = apps.get_model('products', 'StockSnapshot')
+    now = timezone.now()
+    StockSnapshot.objects.bulk_create(
+        (StockSnapshot(product_id=pk, quantity=quantity, taken_at=now)
+         for pk, quantity in Product.objects.values_list('pk', 'stock_quantity').iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_stock_holds'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_snapshot', serialize=False, to='products.product')),
+                ('quantity', models.IntegerField(default=0)),
+                ('taken_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(help_text='Signed change to stock_quantity')),
+                ('reason', models.CharField(choices=[('opening', 'Opening stock'), ('checkout', 'Checkout'), ('cancellation', 'Cancellation'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('reference', models.CharField(blank=True, help_text='Order number, if any', max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='products.product')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'created_at'], name='stockmove_product_created_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('stock_quantity__lte', models.F('low_stock_threshold'))), fields=['stock_quantity'], name='product_low_stock_idx'),
+        ),
+    ]
@@ -1,4 +1,11 @@
 from django.db import models
+from django.db.models import F, Q
+from django.conf import settings
+from django.utils import timezone
+
+# Active products at or below their restock threshold. Shared by the partial
+# index below and products.inventory.low_stock, so the query can use it.
+LOW_STOCK = Q(is_active=True, stock_quantity__lte=F('low_stock_threshold'))
 
 # Create your models here.
 class Category(models.Model):
@@ -25,11 +32,112 @@ class Product(models.Model):
     compare_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     sku = models.CharField(max_length=50, unique=True, help_text="Stock Keeping Unit")
     stock_quantity = models.PositiveIntegerField(default=0)
+    # Sum of active StockHold quantities, maintained by products.reservations
+    reserved_quantity = models.PositiveIntegerField(default=0)
     low_stock_threshold = models.PositiveIntegerField(default=10)
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Only holds low-stock rows, so listing them is O(results)
+            models.Index(fields=['stock_quantity'], condition=LOW_STOCK, name='product_low_stock_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding and isinstance(self.stock_quantity, int) and self.stock_quantity:
+            StockMovement.objects.create(
+                product=self, quantity=self.stock_quantity, reason=StockMovement.Reason.OPENING
+            )
+
+    @property
+    def available_quantity(self):
+        """Stock that isn't held by someone's checkout."""
+        return max(self.stock_quantity - self.reserved_quantity, 0)
+
+class StockHold(models.Model):
+    """
+    A short-lived claim on stock while a customer checks out.
+    Active holds are summed into Product.reserved_quantity.
+    """
+    product = models.ForeignKey(Product, related_name='holds', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='stock_holds', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='stockhold_user_product_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='stockhold_expires_idx'),
+            models.Index(fields=['product', 'expires_at'], name='stockhold_product_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product} held until {self.expires_at}"
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger of stock changes. Product.stock_quantity stays the
+    live counter; the ledger explains it. Old rows are folded into
+    StockSnapshot by `compact_stock_ledger`, so a product's ledger stock is
+    its snapshot plus the movements still in this table (products.inventory).
+    """
+    class Reason(models.TextChoices):
+        OPENING = 'opening', 'Opening stock'
+        CHECKOUT = 'checkout', 'Checkout'
+        CANCELLATION = 'cancellation', 'Cancellation'
+        ADJUSTMENT = 'adjustment', 'Adjustment'
+
+    product = models.ForeignKey(Product, related_name='movements', on_delete=models.CASCADE)
+    quantity = models.IntegerField(help_text="Signed change to stock_quantity")
+    reason = models.CharField(max_length=20, choices=Reason.choices)
+    reference = models.CharField(max_length=64, blank=True, help_text="Order number, if any")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='stockmove_product_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity:+d} {self.product} ({self.reason})"
+
+class StockSnapshot(models.Model):
+    """Stock of a product as of `taken_at`, with every earlier movement folded in."""
+    product = models.OneToOneField(Product, primary_key=True, related_name='stock_snapshot', on_delete=models.CASCADE)
+    quantity = models.IntegerField(default=0)
+    taken_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.product}: {self.quantity} at {self.taken_at}"
+
+class ProductRelation(models.Model):
+    """
+    "Frequently bought together": `related` appeared in `score` orders
+    together with `product`. Rebuilt offline by `build_related_products`;
+    `rank` 0 is the strongest relation.
+    """
+    product = models.ForeignKey(Product, related_name='relations', on_delete=models.CASCADE)
+    related = models.ForeignKey(Product, related_name='related_from', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the index for reading a product's relations in rank order
+            models.UniqueConstraint(fields=['product', 'rank'], name='productrelation_product_rank_uniq'),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.product} -> {self.related} ({self.score})"
@@ -0,0 +1,61 @@
+"""
+"Frequently bought together" recommendations from order co-occurrence.
+
+`build` streams (order_id, product_id) pairs from OrderItem in order id
+order, so only one basket is in memory at a time, and counts how often each
+pair of products shares an order in a sparse `{product: Counter}`. Memory is
+bounded by pruning: when a product's counter grows past PRUNE_FACTOR * top_k
+entries it is cut back to the strongest half of them. Counts are then
+approximate, but a pair can only be dropped while it is far outside the top
+K. Baskets with more than `max_basket` products (bulk or wholesale orders)
+are skipped, since they add pairs quadratically and say little about what
+goes together.
+
+`store` replaces the ProductRelation table with the result in one
+transaction; the product pages read it with one indexed query.
+"""
+from collections import Counter, defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+
+from .models import ProductRelation
+
+PRUNE_FACTOR = 20
+
+
+def baskets(order_items, chunk_size=5000):
+    """Yield the distinct product ids of each order in `order_items`."""
+    rows = order_items.order_by('order_id').values_list('order_id', 'product_id').iterator(chunk_size=chunk_size)
+    for _, items in groupby(rows, key=itemgetter(0)):
+        yield {product_id for _, product_id in items}
+
+
+def build(order_items, top_k=10, max_basket=50, chunk_size=5000):
+    """Return `{product_id: [(related_id, score), ...]}` with the `top_k` strongest relations per product."""
+    limit = top_k * PRUNE_FACTOR
+    counts = defaultdict(Counter)
+    for basket in baskets(order_items, chunk_size):
+        if len(basket) < 2 or len(basket) > max_basket:
+            continue
+        for product_id in basket:
+            counter = counts[product_id]
+            counter.update(basket)
+            del counter[product_id]
+            if len(counter) > limit:
+                counts[product_id] = Counter(dict(counter.most_common(limit // 2)))
+    return {product_id: counter.most_common(top_k) for product_id, counter in counts.items()}
+
+
+def store(table, batch_size=5000):
+    """Replace every ProductRelation with `table`. Returns the number of rows written."""
+    relations = [
+        ProductRelation(product_id=product_id, related_id=related_id, rank=rank, score=score)
+        for product_id, related in table.items()
+        for rank, (related_id, score) in enumerate(related)
+    ]
+    with transaction.atomic():
+        ProductRelation.objects.all().delete()
+        ProductRelation.objects.bulk_create(relations, batch_size=batch_size)
+    return len(relations)
@@ -0,0 +1,139 @@
+"""
+Stock reservations: short-lived holds against Product.stock_quantity.
+
+Available-to-sell is `stock_quantity - reserved_quantity`, where
+`reserved_quantity` is a counter moved with conditional F() updates, so
+checking and claiming stock is a single UPDATE per product rather than a
+scan over the holds table. Expired holds are released in bulk by
+`sweep_expired` (the `sweep_stock_holds` command), and inline for a single
+product when a reservation would otherwise fail.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Product, StockHold
+
+
+class InsufficientStock(Exception):
+    def __init__(self, products):
+        self.products = products
+        super().__init__(f"Not enough stock for {', '.join(str(product) for product in products)}")
+
+
+def _release_counts(counts):
+    """Subtract `{product_id: quantity}` from reserved_quantity in one UPDATE."""
+    counts = {product_id: quantity for product_id, quantity in counts.items() if quantity}
+    if not counts:
+        return
+    Product.objects.filter(pk__in=counts).update(
+        reserved_quantity=F('reserved_quantity') - Case(
+            *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in counts.items()],
+            default=Value(0), output_field=IntegerField(),
+        )
+    )
+
+
+def _release(holds):
+    """Delete `holds` (already locked by the caller) and give their stock back."""
+    counts = defaultdict(int)
+    for hold in holds:
+        counts[hold.product_id] += hold.quantity
+    StockHold.objects.filter(pk__in=[hold.pk for hold in holds]).delete()
+    _release_counts(counts)
+
+
+def _claim(product_id, quantity):
+    return Product.objects.filter(
+        pk=product_id, is_active=True, stock_quantity__gte=F('reserved_quantity') + quantity,
+    ).update(reserved_quantity=F('reserved_quantity') + quantity)
+
+
+def reserve(user, quantities, ttl=None):
+    """
+    Hold `{product_id: quantity}` for `user` for `ttl` seconds
+    (STOCK_HOLD_TTL by default), replacing the user's previous holds.
+    Raises InsufficientStock, without holding anything, if any line can't be met.
+    """
+    ttl = settings.STOCK_HOLD_TTL if ttl is None else ttl
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+
+    with transaction.atomic():
+        _release(list(StockHold.objects.select_for_update().filter(user=user)))
+
+        short = []
+        for product_id, quantity in sorted(quantities.items()):
+            if _claim(product_id, quantity):
+                continue
+            # Expired holds may still be counted; free them and try once more.
+            sweep_expired(product_id=product_id)
+            if not _claim(product_id, quantity):
+                short.append(product_id)
+        if short:
+            raise InsufficientStock(list(Product.objects.filter(pk__in=short)))
+
+        return StockHold.objects.bulk_create([
+            StockHold(user=user, product_id=product_id, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()
+        ])
+
+
+def release(user):
+    """Drop all of `user`'s holds."""
+    with transaction.atomic():
+        _release(list(StockHold.objects.select_for_update().filter(user=user)))
+
+
+def held_quantities(user, product_ids):
+    """`{product_id: quantity}` currently held by `user` (expired or not)."""
+    return dict(
+        StockHold.objects.filter(user=user, product_id__in=product_ids).values_list('product_id', 'quantity')
+    )
+
+
+def commit(user, quantities):
+    """
+    Take `{product_id: quantity}` out of stock at checkout, converting the
+    user's holds on those products into the decrement. Must run inside the
+    checkout transaction; raises InsufficientStock if available-to-sell
+    (plus the user's own holds) doesn't cover a line.
+    """
+    held = {}
+    holds = list(StockHold.objects.select_for_update().filter(user=user, product_id__in=quantities))
+    for hold in holds:
+        held[hold.product_id] = hold.quantity
+
+    short = []
+    for product_id, quantity in sorted(quantities.items()):
+        own = held.get(product_id, 0)
+        updated = Product.objects.filter(
+            pk=product_id, stock_quantity__gte=F('reserved_quantity') - own + quantity,
+        ).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            reserved_quantity=F('reserved_quantity') - own,
+        )
+        if not updated:
+            short.append(product_id)
+    if short:
+        raise InsufficientStock(list(Product.objects.filter(pk__in=short)))
+
+    StockHold.objects.filter(pk__in=[hold.pk for hold in holds]).delete()
+
+
+def sweep_expired(batch_size=1000, product_id=None):
+    """Release expired holds in batches. Returns the number released."""
+    released = 0
+    while True:
+        with transaction.atomic():
+            expired = StockHold.objects.select_for_update(skip_locked=True).filter(expires_at__lte=timezone.now())
+            if product_id is not None:
+                expired = expired.filter(product_id=product_id)
+            holds = list(expired.only('pk', 'product_id', 'quantity')[:batch_size])
+            _release(holds)
+        released += len(holds)
+        if len(holds) < batch_size:
+            return released
@@ -23,4 +23,27 @@ class ProductSerializer(serializers.ModelSerializer):
             'image', 'price', 'compare_price', 'sku', 'stock_quantity', 
             'low_stock_threshold', 'is_active', 'is_featured', 
             'category', 'category_id', 'created_at', 'updated_at'
-        ]
\ No newline at end of file
+        ]
+
+class ProductCardSerializer(serializers.ModelSerializer):
+    """Compact product representation used by the storefront feeds."""
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'slug', 'short_description', 'image', 'price', 'compare_price', 'category']
+
+class ProductLookupSerializer(serializers.Serializer):
+    """Input for the batch product lookup: exactly one of ids, slugs or skus."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=100)
+    slugs = serializers.ListField(child=serializers.SlugField(), required=False, allow_empty=False, max_length=100)
+    skus = serializers.ListField(child=serializers.CharField(), required=False, allow_empty=False, max_length=100)
+
+    def validate(self, attrs):
+        if len(attrs) != 1:
+            raise serializers.ValidationError('Provide exactly one of ids, slugs or skus.')
+        return attrs
+
+class LowStockSerializer(serializers.ModelSerializer):
+    """Stock levels for the staff low-stock list."""
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'slug', 'sku', 'stock_quantity', 'reserved_quantity', 'low_stock_threshold']
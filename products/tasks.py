@@ -0,0 +1,15 @@
+from django.http import Http404
+
+from core.jobs import task
+from . import feeds
+
+
+@task(concurrency=1)
+def refresh_feeds(names):
+    """Rebuild storefront feeds after catalog or order changes."""
+    for name in names:
+        try:
+            feeds.refresh(name)
+        except Http404:
+            # Category deleted or deactivated since
+            feeds.discard(name)
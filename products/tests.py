@@ -1,3 +1,417 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.fast_serializers import ValuesPlan
+from core.jobs import run_pending
+from core.models import Job
+from orders.models import Order, OrderItem
+from . import feeds, inventory, related, reservations
+from .models import Category, Product, ProductRelation, StockHold, StockMovement, StockSnapshot
+from .serializers import ProductSerializer
+
+
+class ProductValuesPlanTests(TestCase):
+    """The precompiled read path must render exactly like ProductSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Protein', slug='protein', description='Whey & casein')
+        Product.objects.create(
+            category=cls.category, name='Whey Isolate', slug='whey-isolate', description='Fast protein',
+            short_description='Ünïcode – short', image='products/wheyiso.jpg', price=Decimal('59.99'),
+            compare_price=Decimal('69.90'), sku='FS-1', stock_quantity=5, is_featured=True,
+        )
+        Product.objects.create(
+            category=cls.category, name='Casein', slug='casein', description='Slow protein',
+            image='', price=Decimal('10'), sku='FS-2', is_active=False,
+        )
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_list_parity_without_request(self):
+        queryset = Product.objects.all()
+        expected = ProductSerializer(queryset, many=True).data
+        self.assertEqual(self.render(ValuesPlan(ProductSerializer).serialize(queryset)), self.render(expected))
+
+    def test_list_parity_with_request(self):
+        request = Request(APIRequestFactory().get('/'))
+        queryset = Product.objects.order_by('-price')
+        expected = ProductSerializer(queryset, many=True, context={'request': request}).data
+        actual = ValuesPlan(ProductSerializer).serialize(queryset, request=request)
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_endpoints_match_serializer(self):
+        client = APIClient()
+        request = Request(APIRequestFactory().get('/'))
+
+        response = client.get('/api/v1/products/')
+        expected = ProductSerializer(Product.objects.filter(is_active=True), many=True,
+                                     context={'request': request}).data
+        self.assertEqual(response.content, self.render(expected))
+
+        response = client.get('/api/v1/products/whey-isolate/')
+        expected = ProductSerializer(Product.objects.get(slug='whey-isolate'), context={'request': request}).data
+        self.assertEqual(response.content, self.render(expected))
+
+        self.assertEqual(client.get('/api/v1/products/casein/').status_code, 404)
+
+    def test_concurrent_first_use_compiles_once(self):
+        plan = ValuesPlan(ProductSerializer)
+        barrier = threading.Barrier(8)
+
+        def first_use():
+            barrier.wait()
+            plan._compile()
+
+        with mock.patch.object(plan, '_compile_fields', wraps=plan._compile_fields) as compile_fields:
+            threads = [threading.Thread(target=first_use) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        top_level = [call for call in compile_fields.call_args_list if call.args[2] == '']
+        self.assertEqual(len(top_level), 1)
+        self.assertEqual(self.render(plan.serialize(Product.objects.all())),
+                         self.render(ProductSerializer(Product.objects.all(), many=True).data))
+
+
+class StockReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pass')
+        category = Category.objects.create(name='Pre-Workout', slug='pre-workout')
+        cls.product = Product.objects.create(
+            category=category, name='Pump', slug='pump', description='x',
+            price=Decimal('29.99'), sku='FS-P', stock_quantity=3,
+        )
+
+    def assertStock(self, stock, reserved):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock_quantity, self.product.reserved_quantity), (stock, reserved))
+
+    def test_holds_reduce_available_stock(self):
+        reservations.reserve(self.alice, {self.product.pk: 2})
+        self.assertStock(3, 2)
+        self.assertEqual(self.product.available_quantity, 1)
+
+        with self.assertRaises(reservations.InsufficientStock):
+            reservations.reserve(self.bob, {self.product.pk: 2})
+        self.assertStock(3, 2)
+
+        # Reserving again replaces the previous hold instead of adding to it
+        reservations.reserve(self.alice, {self.product.pk: 3})
+        self.assertStock(3, 3)
+        reservations.release(self.alice)
+        self.assertStock(3, 0)
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_expired_holds_are_swept(self):
+        reservations.reserve(self.alice, {self.product.pk: 3}, ttl=60)
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(reservations.sweep_expired(), 1)
+        self.assertStock(3, 0)
+
+        # A reservation blocked only by expired holds frees them inline
+        reservations.reserve(self.alice, {self.product.pk: 3})
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        reservations.reserve(self.bob, {self.product.pk: 2})
+        self.assertStock(3, 2)
+
+    def test_commit_converts_holds(self):
+        reservations.reserve(self.alice, {self.product.pk: 2})
+        with self.assertRaises(reservations.InsufficientStock):
+            reservations.commit(self.bob, {self.product.pk: 2})
+
+        reservations.commit(self.alice, {self.product.pk: 2})
+        self.assertStock(1, 0)
+        self.assertFalse(StockHold.objects.exists())
+
+
+class StockLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('boss', 'boss@example.com', 'pass')
+        category = Category.objects.create(name='Vitamins', slug='vitamins')
+        cls.product = Product.objects.create(
+            category=category, name='Zinc', slug='zinc', description='x',
+            price=Decimal('7.99'), sku='FS-Z', stock_quantity=20,
+        )
+
+    def test_adjustments_are_logged(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=F('stock_quantity') - 5)
+        inventory.record({self.product.pk: -5}, inventory.Reason.CHECKOUT, 'order-1')
+
+        response = client.patch(f'/api/v1/products/{self.product.slug}/', {'stock_quantity': 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['stock_quantity'], 30)
+        self.assertEqual(
+            list(self.product.movements.order_by('pk').values_list('reason', 'quantity')),
+            [('opening', 20), ('checkout', -5), ('adjustment', 15)],
+        )
+        self.assertEqual(inventory.ledger_stock([self.product.pk]), {self.product.pk: 30})
+        self.assertEqual(list(inventory.drift()), [])
+
+    def test_compaction_keeps_ledger_stock(self):
+        inventory.adjust(self.product, -3)
+        StockMovement.objects.update(created_at=timezone.now() - timedelta(days=2))
+        inventory.adjust(self.product, 4)
+
+        self.assertEqual(inventory.compact(timezone.now() - timedelta(days=1)), 2)
+        self.assertEqual(StockSnapshot.objects.get(product=self.product).quantity, 17)
+        self.assertEqual(self.product.movements.count(), 1)
+        self.assertEqual(inventory.ledger_stock([self.product.pk]), {self.product.pk: 21})
+        self.assertEqual(list(inventory.drift()), [])
+
+
+@override_settings(FEED_SIZE=2, FEED_FRESH_SECONDS=300)
+class ProductFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('shopper', 'shopper@example.com', 'pass')
+        cls.category = Category.objects.create(name='Protein', slug='protein')
+        cls.products = [
+            Product.objects.create(
+                category=cls.category, name=f'Bar {n}', slug=f'bar-{n}', description='x', image='products/bar.jpg',
+                price=Decimal('2.50'), sku=f'FS-B{n}', stock_quantity=50, is_featured=n != 1,
+            )
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        Job.objects.all().delete()
+
+    def feed(self, url):
+        response = APIClient().get(f'/api/v1/feeds/{url}/')
+        self.assertEqual(response.status_code, 200)
+        return [card['slug'] for card in response.json()]
+
+    def test_cold_feed_is_built_inline(self):
+        self.assertEqual(self.feed('featured'), ['bar-2', 'bar-0'])
+        self.assertEqual(self.feed('new-arrivals'), ['bar-2', 'bar-1'])
+        card = APIClient().get('/api/v1/feeds/featured/').json()[0]
+        self.assertEqual(card['image'], 'http://testserver/media/products/bar.jpg')
+        self.assertFalse(Job.objects.exists())
+
+    def test_stale_feed_is_served_and_refreshed_in_background(self):
+        self.feed('featured')
+        Product.objects.filter(pk=self.products[0].pk).update(is_featured=False)
+        self.assertEqual(self.feed('featured'), ['bar-2', 'bar-0'])  # still fresh
+
+        cache.set('feed:featured', {**cache.get('feed:featured'), 'fresh_until': time.time() - 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.feed('featured'), ['bar-2', 'bar-0'])
+            self.feed('featured')
+        self.assertEqual(Job.objects.filter(name='products.tasks.refresh_feeds').count(), 1)
+
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(self.feed('featured'), ['bar-2'])
+
+    def test_catalog_changes_queue_a_refresh(self):
+        self.feed('featured')
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_superuser('boss', 'boss@example.com', 'pass'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(f'/api/v1/products/{self.products[2].slug}/', {'is_featured': False})
+        self.assertEqual(response.status_code, 200)
+
+        run_pending()
+        self.assertEqual(self.feed('featured'), ['bar-0'])
+
+    def test_rolled_back_changes_queue_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                feeds.schedule_refresh([feeds.FEATURED])
+                raise ValueError
+        self.assertIsNone(cache.get('feed-queued:featured'))
+        self.assertFalse(Job.objects.exists())
+
+    def test_best_sellers_rank_by_quantity_sold(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for product, quantity in [(self.products[0], 1), (self.products[1], 4), (self.products[0], 2), (self.products[2], 3)]:
+            response = client.post('/api/v1/orders/', {
+                'shipping_address': 'x', 'billing_address': 'x', 'total_amount': '10.00',
+                'items': [{'product_id': product.pk, 'quantity': quantity}],
+            }, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+
+        self.assertEqual(self.feed(f'best-sellers/{self.category.pk}'), ['bar-1', 'bar-0'])
+        self.assertEqual(APIClient().get('/api/v1/feeds/best-sellers/999/').status_code, 404)
+        self.assertEqual(APIClient().get('/api/v1/feeds/bogus/').status_code, 404)
+
+
+class ProductLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Protein', slug='protein')
+        cls.products = [
+            Product.objects.create(
+                category=cls.category, name=f'Shake {n}', slug=f'shake-{n}', description='x',
+                price=Decimal('3.00'), sku=f'FS-S{n}', stock_quantity=10, is_active=n != 2,
+            )
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def lookup(self, data):
+        response = APIClient().post('/api/v1/products/lookup/', data, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.json()
+
+    def test_results_keep_request_order_and_report_missing(self):
+        data = self.lookup({'slugs': ['shake-1', 'nope', 'shake-2', 'shake-0', 'shake-1']})
+        self.assertEqual([row['slug'] for row in data['results']], ['shake-1', 'shake-0'])
+        self.assertEqual(data['missing'], ['nope', 'shake-2'])
+        self.assertEqual(data['results'][0]['category']['slug'], 'protein')
+
+        data = self.lookup({'skus': ['FS-S0', 'FS-X']})
+        self.assertEqual(([row['sku'] for row in data['results']], data['missing']), (['FS-S0'], ['FS-X']))
+
+    def test_cached_products_skip_the_database(self):
+        ids = [product.pk for product in self.products[:2]]
+        with self.assertNumQueries(1):
+            self.lookup({'ids': ids})
+        with self.assertNumQueries(0):
+            data = self.lookup({'ids': ids[::-1]})
+            self.lookup({'slugs': ['shake-0']})
+        self.assertEqual([row['id'] for row in data['results']], ids[::-1])
+
+    def test_stock_changes_invalidate_the_cache(self):
+        self.lookup({'ids': [self.products[0].pk]})
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.adjust(self.products[0], -4)
+        self.assertEqual(self.lookup({'ids': [self.products[0].pk]})['results'][0]['stock_quantity'], 6)
+
+        # Cancellations restock without going through inventory.record
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.restock([(self.products[0].pk, 3, 'order-1')])
+        self.assertEqual(self.lookup({'ids': [self.products[0].pk]})['results'][0]['stock_quantity'], 9)
+
+    def test_rejects_oversized_or_mixed_requests(self):
+        client = APIClient()
+        self.assertEqual(client.post('/api/v1/products/lookup/', {'ids': list(range(101))}, format='json').status_code, 400)
+        self.assertEqual(
+            client.post('/api/v1/products/lookup/', {'ids': [1], 'slugs': ['a']}, format='json').status_code, 400
+        )
+
+
+class LowStockTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('stock', 'stock@example.com', 'pass')
+        category = Category.objects.create(name='Amino', slug='amino')
+        cls.products = {
+            slug: Product.objects.create(
+                category=category, name=slug, slug=slug, description='x', price=Decimal('9.00'), sku=slug.upper(),
+                stock_quantity=stock, low_stock_threshold=5, is_active=active,
+            )
+            for slug, stock, active in [('bcaa', 3, True), ('eaa', 5, True), ('glutamine', 6, True), ('old', 0, False)]
+        }
+
+    def test_staff_endpoint_lists_low_stock(self):
+        client = APIClient()
+        self.assertIn(client.get('/api/v1/products/low-stock/').status_code, (401, 403))
+
+        client.force_authenticate(self.admin)
+        response = client.get('/api/v1/products/low-stock/')
+        self.assertEqual([row['slug'] for row in response.json()], ['bcaa', 'eaa'])
+
+        inventory.adjust(self.products['glutamine'], -2)
+        inventory.adjust(self.products['bcaa'], 10)
+        response = client.get('/api/v1/products/low-stock/')
+        self.assertEqual([(row['slug'], row['stock_quantity']) for row in response.json()], [('glutamine', 4), ('eaa', 5)])
+
+    def test_query_uses_the_partial_index(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIn('product_low_stock_idx', inventory.low_stock().explain())
+
+    def test_check_command(self):
+        out = StringIO()
+        call_command('check_low_stock', stdout=out)
+        self.assertIn('2 product(s) low on stock.', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('check_low_stock', '--fail', stdout=out)
+
+
+class RelatedProductsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('basket', 'basket@example.com', 'pass')
+        protein = Category.objects.create(name='Whey', slug='whey')
+        snacks = Category.objects.create(name='Snacks', slug='snacks')
+        cls.products = {
+            slug: Product.objects.create(
+                category=category, name=slug, slug=slug, description='x', price=Decimal('5.00'),
+                sku=slug.upper(), stock_quantity=100,
+            )
+            for slug, category in [
+                ('whey', protein), ('casein', protein), ('shaker', snacks), ('bar', snacks), ('gel', snacks),
+            ]
+        }
+
+    def order(self, *slugs, status='delivered'):
+        order = Order.objects.create(user=self.user, status=status, total_amount=Decimal('5.00'),
+                                     shipping_address='a', billing_address='b')
+        for slug in slugs:
+            OrderItem.objects.create(order=order, product=self.products[slug], quantity=1, price_at_time=Decimal('5.00'))
+
+    def related(self, slug, **params):
+        response = APIClient().get(f'/api/v1/products/{slug}/related/', params)
+        self.assertEqual(response.status_code, 200)
+        return [card['slug'] for card in response.json()]
+
+    def test_builder_ranks_co_occurrence(self):
+        self.order('whey', 'shaker', 'bar')
+        self.order('whey', 'shaker')
+        self.order('whey', 'shaker', 'bar', 'gel', 'casein', status='cancelled')
+        self.order('whey', 'bar', 'gel', 'casein')  # skipped: over max_basket
+        call_command('build_related_products', '--max-basket', '3', stdout=StringIO())
+
+        self.assertEqual(
+            list(ProductRelation.objects.filter(product=self.products['whey']).values_list('related__slug', 'score')),
+            [('shaker', 2), ('bar', 1)],
+        )
+        with self.assertNumQueries(2):
+            self.assertEqual(self.related('whey', limit=2), ['shaker', 'bar'])
+
+    def test_pruned_counters_keep_the_top_pairs(self):
+        self.order('whey', 'shaker')
+        self.order('whey', 'shaker')
+        self.order('whey', 'bar')
+        self.order('whey', 'gel')
+        with mock.patch.object(related, 'PRUNE_FACTOR', 2):
+            table = related.build(OrderItem.objects.all(), top_k=1, max_basket=5)
+        self.assertEqual(table[self.products['whey'].pk], [(self.products['shaker'].pk, 2)])
+
+    def test_falls_back_to_the_category(self):
+        self.assertEqual(self.related('bar'), ['gel', 'shaker'])
+        self.order('bar', 'whey')
+        related.store(related.build(OrderItem.objects.all()))
+        self.assertEqual(self.related('bar'), ['whey', 'gel', 'shaker'])
+        self.assertEqual(APIClient().get('/api/v1/products/bar/related/', {'limit': 50}).status_code, 400)
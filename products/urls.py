@@ -1,11 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, ProductViewSet
+from .views import CategoryViewSet, ProductFeedView, ProductViewSet
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'categories', CategoryViewSet, basename='category')
 
 urlpatterns = [
+    path('feeds/best-sellers/<int:category_id>/', ProductFeedView.as_view(), {'name': 'best-sellers'},
+         name='product-feed-best-sellers'),
+    path('feeds/<slug:name>/', ProductFeedView.as_view(), name='product-feed'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,8 +1,18 @@
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404
 from django.shortcuts import render
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from core.fast_serializers import ValuesPlan
+from core.throttling import capped_int
+from core.views import FastReadMixin
+from . import cache as product_cache, feeds, inventory
 from .models import Category, Product
-from .serializers import CategorySerializer, ProductSerializer
+from .serializers import CategorySerializer, LowStockSerializer, ProductLookupSerializer, ProductSerializer
 
 # Create your views here.
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -13,13 +23,16 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(FastReadMixin, viewsets.ModelViewSet):
     """
     GET: Publicly readable list of products.
     POST, PUT, DELETE: Restricted to admin users.
     """
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductSerializer
+    # Reads are rendered straight from .values() rows, see core.fast_serializers
+    fast_read_plan = ValuesPlan(ProductSerializer)
+    low_stock_plan = ValuesPlan(LowStockSerializer)
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['category', 'slug']
     lookup_field = 'slug'
@@ -32,8 +45,99 @@ class ProductViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         """Set custom permissions for different actions."""
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'low_stock']:
             self.permission_classes = [permissions.IsAdminUser]
         else:
             self.permission_classes = [permissions.AllowAny]
-        return super().get_permissions()
\ No newline at end of file
+        return super().get_permissions()
+
+    def perform_create(self, serializer):
+        product = serializer.save()
+        feeds.product_changed(product)
+
+    def perform_update(self, serializer):
+        # Stock edits are applied as a delta and logged in the ledger
+        old_quantity = serializer.instance.stock_quantity
+        delta = serializer.validated_data.get('stock_quantity', old_quantity) - old_quantity
+        with transaction.atomic():
+            if delta:
+                product = serializer.save(stock_quantity=F('stock_quantity'))
+            else:
+                product = serializer.save()
+            inventory.adjust(product, delta, user=self.request.user)
+            product_cache.invalidate([product.pk])
+            feeds.product_changed(product)
+
+    def perform_destroy(self, instance):
+        product_cache.invalidate([instance.pk])
+        feeds.product_changed(instance)
+        instance.delete()
+
+    @action(detail=True, methods=['get'])
+    def related(self, request, slug=None):
+        """
+        "Frequently bought together" (see products.related), topped up with
+        other products from the same category. ?limit=1-20, default 8.
+        """
+        limit = capped_int(request, 'limit', 8, 1, 20)
+        product = self.get_object()
+        cards = feeds.card_plan.serialize(
+            Product.objects.filter(related_from__product=product, is_active=True).order_by('related_from__rank')[:limit],
+            request=request,
+        )
+        if len(cards) < limit:
+            seen = [product.pk] + [card['id'] for card in cards]
+            cards += feeds.card_plan.serialize(
+                Product.objects.filter(category_id=product.category_id, is_active=True).exclude(pk__in=seen)
+                .order_by('-is_featured', '-created_at')[:limit - len(cards)],
+                request=request,
+            )
+        return Response(cards)
+
+    @action(detail=False, methods=['get'], url_path='low-stock')
+    def low_stock(self, request):
+        """Active products at or below their low_stock_threshold, lowest stock first (staff only)."""
+        return Response(self.low_stock_plan.serialize(inventory.low_stock()))
+
+    @action(detail=False, methods=['post'])
+    def lookup(self, request):
+        """
+        Resolve many products at once: {"ids": [...]}, {"slugs": [...]} or {"skus": [...]}.
+        Results keep the request order; unknown or inactive keys are listed in `missing`.
+        """
+        serializer = ProductLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        kind, keys = next(iter(serializer.validated_data.items()))
+        field = {'ids': 'id', 'slugs': 'slug', 'skus': 'sku'}[kind]
+        keys = list(dict.fromkeys(keys))
+
+        found = product_cache.get_many(field, keys)
+        results, missing = [], []
+        for key in keys:
+            row = found.get(key)
+            if row is None or not (row['is_active'] or request.user.is_staff):
+                missing.append(key)
+            elif row['image']:
+                results.append({**row, 'image': request.build_absolute_uri(row['image'])})
+            else:
+                results.append(row)
+        return Response({'results': results, 'missing': missing})
+
+class ProductFeedView(APIView):
+    """
+    Storefront feeds, precomputed and served from the cache (see products.feeds).
+    - GET feeds/featured/, feeds/new-arrivals/
+    - GET feeds/best-sellers/<category_id>/
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, name, category_id=None):
+        if category_id is not None:
+            name = feeds.best_sellers(category_id)
+        elif name not in (feeds.FEATURED, feeds.NEW_ARRIVALS):
+            raise Http404(f'No feed named {name!r}.')
+        # Cached cards hold relative image URLs
+        return Response([
+            {**card, 'image': request.build_absolute_uri(card['image'])} if card['image'] else card
+            for card in feeds.get(name)
+        ])